@@ -1,5 +1,9 @@
+import heapq
+import itertools
 import math
+import os
 import time
+from array import array
 
 
 class Node:
@@ -26,6 +30,8 @@ class Node:
         __eq__(other)
             Checks if this node is equal to another node based on position.
     """
+    __slots__ = ("position", "g", "h", "f", "parent")
+
     def __init__(self, position, g=0, h=0, parent=None):
         self.position = position
         self.g = g
@@ -39,23 +45,228 @@ class Node:
 # Define possible moves: up, down, left, right
 MOVES = [(0, 1), (1, 0), (0, -1), (-1, 0), (-1, -1), (1, 1), (-1, 1), (1, -1)]
 
+
+def octile_distance(position, target_position, diagonal=False, diagonal_cost=True):
+    """
+    :param position: A tuple containing the row and column of a cell.
+    :param target_position: A tuple containing the row and column of another cell.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+    :return: The cost between the cells on an empty grid, a consistent heuristic for the movement mode: Manhattan,
+        Chebyshev when diagonal moves cost 1, or octile when they cost sqrt(2).
+    """
+    d_row = abs(position[0] - target_position[0])
+    d_col = abs(position[1] - target_position[1])
+    if not diagonal:
+        return d_row + d_col
+    if not diagonal_cost:
+        return max(d_row, d_col)
+    return max(d_row, d_col) + (math.sqrt(2) - 1) * min(d_row, d_col)
+
+
+class ExpansionLog:
+    """
+        ExpansionLog records the cells a search expands, in order, along with the expansion each was reached from.
+
+        Cells are stored as flat ``row * width + col`` indices and parents as positions in the log, in two
+        ``array`` buffers, so the log costs two machine words per expansion. The explored path of any expansion
+        (what ``get_explored_paths`` used to build for every expansion up front) can be rebuilt on demand with
+        ``retrace``, and ``events`` replays the expansions lazily.
+
+        Attributes
+        ----------
+        width : int
+            The width of the grid, used to convert between indices and positions.
+        cells : array
+            The index of each expanded cell, in expansion order.
+        parents : array
+            The position in the log of the expansion each cell was reached from, or -1 for the root of the search.
+
+        Methods
+        -------
+        append(cell, parent)
+            Records an expansion.
+        events()
+            Yields (position, parent position) tuples in expansion order.
+        retrace(index)
+            Returns the explored path of an expansion.
+    """
+    def __init__(self, width):
+        self.width = width
+        self.cells = array("l")
+        self.parents = array("l")
+
+    def __len__(self):
+        return len(self.cells)
+
+    def append(self, cell, parent):
+        """
+        :param cell: The index of the expanded cell.
+        :param parent: The position in the log of the expansion the cell was reached from, or -1.
+        :return: The position of the new expansion in the log.
+        """
+        self.cells.append(cell)
+        self.parents.append(parent)
+        return len(self.cells) - 1
+
+    def events(self):
+        """
+        :return: A generator of (position, parent position) tuples in expansion order; the root's parent is None.
+        """
+        width, cells = self.width, self.cells
+        for cell, parent in zip(cells, self.parents):
+            yield divmod(cell, width), (divmod(cells[parent], width) if parent != -1 else None)
+
+    def retrace(self, index):
+        """
+        :param index: The position of an expansion in the log (negative values count from the end).
+        :return: The positions from the expanded cell back to (but excluding) the root, one cell per step.
+        """
+        if index < 0:
+            index += len(self.cells)
+        retraced_path = []
+        width, cells, parents = self.width, self.cells, self.parents
+        while parents[index] != -1:
+            row, col = divmod(cells[index], width)
+            parent_row, parent_col = divmod(cells[parents[index]], width)
+            # parents of jump point searches can be several cells away along a straight or diagonal line
+            d_row = (parent_row > row) - (parent_row < row)
+            d_col = (parent_col > col) - (parent_col < col)
+            while (row, col) != (parent_row, parent_col):
+                retraced_path.append((row, col))
+                row, col = row + d_row, col + d_col
+            index = parents[index]
+        return retraced_path
+
+
+class SearchStats:
+    """
+        SearchStats holds the counters a search fills in while it runs, for explaining why a query was slow.
+
+        The counters are always kept. The two timers are only filled when the search is created with
+        ``profile=True``, since timing every heuristic call slows the search down noticeably.
+
+        Attributes
+        ----------
+        expanded : int
+            The number of nodes taken off the open list and closed.
+        generated : int
+            The number of successor nodes pushed onto the open list.
+        duplicates : int
+            The number of successors dropped because their cell was already closed, or already open at no greater cost.
+        reopened : int
+            The number of closed nodes put back on the open list; the searches here never reopen nodes, so this
+            stays 0 unless a subclass does.
+        peak_open : int
+            The largest number of live nodes on the open list at once.
+        heuristic_time : float
+            The time spent in heuristic calls (profile only).
+        neighbor_time : float
+            The time spent generating successors, including their heuristic calls (profile only).
+        time : float
+            The wall time of the whole search.
+
+        Methods
+        -------
+        as_dict()
+            Returns the counters and timers as a dict, for metrics systems.
+    """
+    __slots__ = ("expanded", "generated", "duplicates", "reopened", "peak_open", "heuristic_time", "neighbor_time",
+                 "time")
+
+    def __init__(self):
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.reopened = 0
+        self.peak_open = 0
+        self.heuristic_time = 0.0
+        self.neighbor_time = 0.0
+        self.time = 0.0
+
+    def as_dict(self):
+        """
+        :return: A dict of every counter and timer by name.
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
 class AStar:
     """
     class AStar:
 
     def __init__(self, grid, start_pos, target_pos, diagonal=False):
         """
-    def __init__(self, grid, start_pos, target_pos, diagonal=False, diagonal_cost=True):
+    def __init__(self, grid, start_pos, target_pos, diagonal=False, diagonal_cost=True, jump_point=False,
+                 profile=False, weight=1, heuristic=None, components=None, occupancy=None):
         self.grid = grid
         self.start_pos = start_pos
         self.target_pos = target_pos
+        # heap of (f, insertion order, node) entries; stale entries are skipped lazily on pop
         self.open_list = []
+        # position -> the live node in the open list for that position
+        self.open_nodes = {}
         self.closed_list = []
+        self.closed_set = set()
+        self.expansions = ExpansionLog(len(grid[0]))
+        # position -> position of its expansion in the expansion log
+        self.expansion_order = {}
+        self.counter = itertools.count()
         self.path = []
         self.moves = MOVES if diagonal else MOVES[:4]
         self.explored_paths = []
         self.diagonal = diagonal
         self.diagonal_cost = diagonal_cost
+        # Jump Point Search only applies to 8-connected grids
+        self.jump_point = jump_point and diagonal
+        # weighted A*: with a weight above 1 the heuristic is inflated and paths cost at most weight times the optimum
+        self.weight = weight
+        # an optional consistent heuristic(position, target_position) replacing the built-in distances,
+        # such as Landmarks.heuristic
+        self.heuristic_function = heuristic
+        # an optional ComponentIndex of the grid for the mode; queries between components fail without searching
+        self.components = components
+        # an optional OccupancyGrid of the grid for the mode, whose neighbor masks replace the per-move bounds and
+        # obstacle checks
+        if occupancy is not None and occupancy.diagonal != diagonal:
+            raise ValueError("the occupancy grid was built for a different movement mode")
+        self.occupancy = occupancy
+        # the (d_row, d_col, index delta, cost) steps of every move, or of the open moves of each mask
+        if occupancy is not None:
+            self.successor_table = occupancy.successor_table(diagonal_cost)
+        self.steps = [(move[0], move[1], move[0] * len(grid[0]) + move[1],
+                       math.sqrt(2) if diagonal and diagonal_cost and move[0] != 0 and move[1] != 0 else 1)
+                      for move in self.moves]
+        self.stats = SearchStats()
+        self.profile = profile
+        # optional callbacks, checked once per event, so an unset hook costs a single comparison:
+        # on_expand(position, g), on_push(position, g, f) and on_done(result, stats)
+        self.on_expand = None
+        self.on_push = None
+        self.on_done = None
+        if profile:
+            self.time_heuristics()
+
+    def time_heuristics(self):
+        """
+        Shadows the heuristic methods on this instance with wrappers that add their run time to stats.heuristic_time.
+
+        :return: None
+        """
+        stats = self.stats
+
+        def timed(function):
+            def wrapper(position, target_position):
+                start_time = time.perf_counter()
+                result = function(position, target_position)
+                stats.heuristic_time += time.perf_counter() - start_time
+                return result
+            return wrapper
+
+        for name in ("get_manhattan_distance", "get_euclidean_distance", "get_chebyshev_distance"):
+            setattr(self, name, timed(getattr(self, name)))
+        if self.heuristic_function is not None:
+            self.heuristic_function = timed(self.heuristic_function)
 
     def get_manhattan_distance(self, position, target_position):
         """
@@ -73,36 +284,257 @@ class AStar:
         """
         return math.sqrt((position[0] - target_position[0]) ** 2 + (position[1] - target_position[1]) ** 2)
 
+    def get_chebyshev_distance(self, position, target_position):
+        """
+        :param position: A tuple containing the x and y coordinates of the current position.
+        :param target_position: A tuple containing the x and y coordinates of the target position.
+        :return: The Chebyshev distance between the two points, the exact cost on an empty grid when diagonal moves cost 1.
+        """
+        return max(abs(position[0] - target_position[0]), abs(position[1] - target_position[1]))
+
+    def get_consistent_distance(self, position, target_position):
+        """
+        :param position: A tuple containing the x and y coordinates of the current position.
+        :param target_position: A tuple containing the x and y coordinates of the target position.
+        :return: A consistent estimate of the cost between the two positions: the heuristic passed in if any,
+            otherwise the distance for the current mode (Manhattan, Chebyshev when diagonal moves cost 1, or
+            Euclidean when they cost sqrt(2)). Weighted searches need it for their bound to hold.
+        """
+        if self.heuristic_function is not None:
+            return self.heuristic_function(position, target_position)
+        if not self.diagonal:
+            return self.get_manhattan_distance(position, target_position)
+        if not self.diagonal_cost:
+            return self.get_chebyshev_distance(position, target_position)
+        return self.get_euclidean_distance(position, target_position)
+
+    def unreachable(self):
+        """
+        :return: True if the component index shows that no path exists between the start and the target.
+        """
+        return self.components is not None and not self.components.connected(self.start_pos, self.target_pos)
 
     def add_neighbors(self, init_node):
         """
         :param init_node: The initial node from which neighboring nodes are to be generated.
         :return: None
         """
-        for move in self.moves:
-            added_g_cost = 1
-            if self.diagonal and self.diagonal_cost:
-                if move[0] != 0 and move[1] != 0:
-                    added_g_cost = math.sqrt(2)
-            new_pos = (init_node.position[0] + move[0], init_node.position[1] + move[1])
+        if self.jump_point:
+            self.add_jump_points(init_node)
+            return
+        row, col = init_node.position
+        occupancy = self.occupancy
+        if occupancy is not None:
+            # only the open moves, which need no bounds or obstacle checks
+            steps = self.successor_table[occupancy.masks[row * occupancy.width + col]]
+        else:
+            steps = self.steps
+        for d_row, d_col, _, added_g_cost in steps:
+            new_pos = (row + d_row, col + d_col)
 
             # Ensure new position is within grid bounds
-            if 0 <= new_pos[0] < len(self.grid) and 0 <= new_pos[1] < len(self.grid[0]):
-                if self.grid[new_pos[0]][new_pos[1]] == 0:  # Check if not an obstacle
-                    g_cost = init_node.g + added_g_cost
+            if occupancy is not None or 0 <= new_pos[0] < len(self.grid) and 0 <= new_pos[1] < len(self.grid[0]):
+                # Check if not an obstacle
+                if occupancy is None and self.grid[new_pos[0]][new_pos[1]] != 0:
+                    continue
+                # Check if not already scanned
+                if new_pos in self.closed_set:
+                    self.stats.duplicates += 1
+                    continue
+                g_cost = init_node.g + added_g_cost
+                if self.weight == 1 and self.heuristic_function is None:
                     h_cost = self.get_euclidean_distance(new_pos, self.target_pos) if self.diagonal else self.get_manhattan_distance(new_pos, self.target_pos)
-                    new_node = Node(new_pos, g=g_cost, h=h_cost, parent=init_node)
+                else:
+                    h_cost = self.weight * self.get_consistent_distance(new_pos, self.target_pos)
+
+                # get the existing version of the node, if it already exists in the open list
+                existing_node = self.open_nodes.get(new_pos)
 
-                    # if node is not already scanned
-                    if new_node not in self.closed_list:
-                        # get the existing version of the node, if it already exists in the open list
-                        existing_node = next((n for n in self.open_list if n == new_node), None)
+                # if the node doesn't already exist, or there is a shorter path to the node, update it
+                # (nodes are only allocated once they are known to be kept)
+                if existing_node is None or g_cost + h_cost < existing_node.f:
+                    # the older version (if any) is left in the heap and skipped when popped
+                    self.push(Node(new_pos, g=g_cost, h=h_cost, parent=init_node))
+                else:
+                    self.stats.duplicates += 1
 
-                        # if the node doesn't already exist, or there is a shorter path to the node, update it
-                        if existing_node is None or new_node.f < existing_node.f:
-                            if existing_node:
-                                self.open_list.remove(existing_node)  # Remove the older version
-                            self.open_list.append(new_node)  # Add the updated version
+    def is_walkable(self, row, col):
+        """
+        :param row: The row of the cell.
+        :param col: The column of the cell.
+        :return: True if the cell is within the grid and not an obstacle.
+        """
+        return 0 <= row < len(self.grid) and 0 <= col < len(self.grid[0]) and self.grid[row][col] == 0
+
+    def jump_straight(self, row, col, d_row, d_col):
+        """
+        Steps from a cell in a horizontal or vertical direction until reaching a jump point or a dead end.
+
+        :param row: The row of the cell to jump from.
+        :param col: The column of the cell to jump from.
+        :param d_row: The row direction, -1, 0 or 1.
+        :param d_col: The column direction, -1, 0 or 1 (exactly one of d_row and d_col is 0).
+        :return: The position of the jump point, or None if the jump hits an obstacle or the grid edge.
+        """
+        walkable = self.is_walkable
+        while True:
+            row, col = row + d_row, col + d_col
+            if not walkable(row, col):
+                return None
+            if (row, col) == self.target_pos:
+                return row, col
+            # a neighbor that can only be reached optimally through this cell makes it a jump point
+            if d_row == 0:
+                if (walkable(row + 1, col + d_col) and not walkable(row + 1, col)) or \
+                        (walkable(row - 1, col + d_col) and not walkable(row - 1, col)):
+                    return row, col
+            elif (walkable(row + d_row, col + 1) and not walkable(row, col + 1)) or \
+                    (walkable(row + d_row, col - 1) and not walkable(row, col - 1)):
+                return row, col
+
+    def jump_diagonal(self, row, col, d_row, d_col):
+        """
+        Steps from a cell in a diagonal direction until reaching a jump point or a dead end.
+
+        :param row: The row of the cell to jump from.
+        :param col: The column of the cell to jump from.
+        :param d_row: The row direction, -1 or 1.
+        :param d_col: The column direction, -1 or 1.
+        :return: The position of the jump point, or None if the jump hits an obstacle or the grid edge.
+        """
+        walkable = self.is_walkable
+        while True:
+            row, col = row + d_row, col + d_col
+            if not walkable(row, col):
+                return None
+            if (row, col) == self.target_pos:
+                return row, col
+            if (walkable(row - d_row, col + d_col) and not walkable(row - d_row, col)) or \
+                    (walkable(row + d_row, col - d_col) and not walkable(row, col - d_col)):
+                return row, col
+            # a cell is also a jump point if a straight jump from it reaches one
+            if self.jump_straight(row, col, d_row, 0) or self.jump_straight(row, col, 0, d_col):
+                return row, col
+
+    def get_pruned_directions(self, node):
+        """
+        :param node: The node being expanded.
+        :return: The directions worth jumping in from the node, given the direction it was reached from.
+        """
+        if node.parent is None:
+            return self.moves
+        row, col = node.position
+        d_row = (row > node.parent.position[0]) - (row < node.parent.position[0])
+        d_col = (col > node.parent.position[1]) - (col < node.parent.position[1])
+        walkable = self.is_walkable
+        if d_row != 0 and d_col != 0:
+            directions = [(0, d_col), (d_row, 0), (d_row, d_col)]
+            if not walkable(row - d_row, col):
+                directions.append((-d_row, d_col))
+            if not walkable(row, col - d_col):
+                directions.append((d_row, -d_col))
+        elif d_row == 0:
+            directions = [(0, d_col)]
+            if not walkable(row + 1, col):
+                directions.append((1, d_col))
+            if not walkable(row - 1, col):
+                directions.append((-1, d_col))
+        else:
+            directions = [(d_row, 0)]
+            if not walkable(row, col + 1):
+                directions.append((d_row, 1))
+            if not walkable(row, col - 1):
+                directions.append((d_row, -1))
+        return directions
+
+    def add_jump_points(self, init_node):
+        """
+        Jump Point Search successor generation: jumps in each pruned direction and adds the jump points found.
+
+        :param init_node: The initial node from which jump points are to be generated.
+        :return: None
+        """
+        row, col = init_node.position
+        for d_row, d_col in self.get_pruned_directions(init_node):
+            if d_row != 0 and d_col != 0:
+                new_pos = self.jump_diagonal(row, col, d_row, d_col)
+            else:
+                new_pos = self.jump_straight(row, col, d_row, d_col)
+            if new_pos is None:
+                continue
+            if new_pos in self.closed_set:
+                self.stats.duplicates += 1
+                continue
+
+            # jumps follow a straight line, so the cost is the step count times the cost of one step
+            steps = max(abs(new_pos[0] - row), abs(new_pos[1] - col))
+            added_g_cost = steps * math.sqrt(2) if d_row != 0 and d_col != 0 and self.diagonal_cost else steps
+            g_cost = init_node.g + added_g_cost
+            if self.heuristic_function is not None:
+                h_cost = self.heuristic_function(new_pos, self.target_pos)
+            elif self.diagonal_cost:
+                h_cost = self.get_euclidean_distance(new_pos, self.target_pos)
+            else:
+                # Euclidean distance overestimates when diagonal moves cost 1
+                h_cost = self.get_chebyshev_distance(new_pos, self.target_pos)
+            if self.weight != 1:
+                h_cost *= self.weight
+
+            existing_node = self.open_nodes.get(new_pos)
+            if existing_node is None or g_cost + h_cost < existing_node.f:
+                self.push(Node(new_pos, g=g_cost, h=h_cost, parent=init_node))
+            else:
+                self.stats.duplicates += 1
+
+    def retrace(self, node):
+        """
+        :param node: A searched node.
+        :return: The positions from the node back to (but excluding) the start position, one cell per step.
+        """
+        retraced_path = []
+        while node.parent:
+            row, col = node.position
+            if self.jump_point:
+                # fill in the cells skipped by the jump from the parent
+                parent_row, parent_col = node.parent.position
+                d_row = (parent_row > row) - (parent_row < row)
+                d_col = (parent_col > col) - (parent_col < col)
+                while (row, col) != node.parent.position:
+                    retraced_path.append((row, col))
+                    row, col = row + d_row, col + d_col
+            else:
+                retraced_path.append(node.position)
+            node = node.parent
+        return retraced_path
+
+    def push(self, node):
+        """
+        Adds a node to the open list, replacing any older version of the node at the same position.
+
+        Ties on f are broken by insertion order, so the earliest pushed node is expanded first.
+
+        :param node: The node to add to the open list.
+        :return: None
+        """
+        self.open_nodes[node.position] = node
+        heapq.heappush(self.open_list, (node.f, next(self.counter), node))
+        if node.parent is not None:
+            self.stats.generated += 1
+        if self.on_push is not None:
+            self.on_push(node.position, node.g, node.f)
+
+    def pop(self):
+        """
+        Removes and returns the open node with the smallest f value, skipping stale heap entries.
+
+        :return: The node with the smallest f value, or None if the open list is empty.
+        """
+        while self.open_list:
+            node = heapq.heappop(self.open_list)[2]
+            if self.open_nodes.get(node.position) is node:
+                del self.open_nodes[node.position]
+                return node
+        return None
 
     def find_path(self):
         """
@@ -114,47 +546,835 @@ class AStar:
         tracing back through the parent nodes and returns the path along with the elapsed time.
 
         :return: A tuple containing the list of positions representing the path from the start position to the target position,
-            and the time taken to find the path.
+            the time taken to find the path and the path cost. If there is no path, the list is None and the cost is inf.
         """
         start_time = time.time()
+        if self.unreachable():
+            return self.finish((None, (time.time() - start_time), math.inf), start_time)
+        stats = self.stats
+        profile = self.profile
+        on_expand = self.on_expand
         start_node = Node(self.start_pos, h=self.get_manhattan_distance(self.start_pos, self.target_pos))
-        self.open_list.append(start_node)
+        self.push(start_node)
 
         self.path = []
 
-        while self.open_list:
-            # curr node is set to the smallest f value
-            curr_node = min(self.open_list, key=lambda node: node.f)
-
-            # removes the curr node from open list and adds it to closed list
-            self.open_list.remove(curr_node)
+        while self.open_nodes:
+            if len(self.open_nodes) > stats.peak_open:
+                stats.peak_open = len(self.open_nodes)
+            # curr node is set to the smallest f value, removed from the open list and added to the closed list
+            curr_node = self.pop()
             self.closed_list.append(curr_node)
+            self.closed_set.add(curr_node.position)
+            self.log_expansion(curr_node)
+            if on_expand is not None:
+                on_expand(curr_node.position, curr_node.g)
 
             # if the curr_node is the target
             if curr_node.position == self.target_pos:
                 total_cost = curr_node.g
-                while curr_node.parent:
-                    self.path.append(curr_node.position)
-                    curr_node = curr_node.parent
+                self.path = self.retrace(curr_node)
                 self.path.append(self.start_pos)
                 self.path.reverse()
                 end_time = time.time()
-                return self.path, (end_time - start_time), total_cost
+                return self.finish((self.path, (end_time - start_time), total_cost), start_time)
+
+            if profile:
+                neighbor_time = time.perf_counter()
+                self.add_neighbors(curr_node)
+                stats.neighbor_time += time.perf_counter() - neighbor_time
+            else:
+                self.add_neighbors(curr_node)
+
+            if not self.open_nodes:
+                return self.finish((None, (time.time() - start_time), math.inf), start_time)
+
+    def finish(self, result, start_time):
+        """
+        Fills in the totals of stats and calls the on_done hook.
+
+        :param result: The tuple find_path is about to return.
+        :param start_time: The time.time() the search started at.
+        :return: The result, unchanged.
+        """
+        self.stats.expanded = len(self.expansions)
+        self.stats.time = time.time() - start_time
+        if self.on_done is not None:
+            self.on_done(result, self.stats)
+        return result
 
-            self.add_neighbors(curr_node)
+    def log_expansion(self, node, expansion_order=None):
+        """
+        :param node: The node being closed.
+        :param expansion_order: The position -> log position map of the node's search tree (default is expansion_order).
+        :return: None
+        """
+        if expansion_order is None:
+            expansion_order = self.expansion_order
+        parent = expansion_order[node.parent.position] if node.parent else -1
+        cell = node.position[0] * self.expansions.width + node.position[1]
+        expansion_order[node.position] = self.expansions.append(cell, parent)
 
-            if not self.open_list:
-                return None, (time.time() - start_time)
+    def iter_expansions(self):
+        """
+        :return: A generator of (position, parent position) tuples for the expanded nodes, in expansion order.
+        """
+        return self.expansions.events()
 
     def get_explored_paths(self):
         """
+        Builds the explored path of every expansion at once; prefer iter_expansions or expansions.retrace,
+        which only rebuild the paths that are needed.
+
         :return: The list of lists where each inner list contains the positions retraced from the start node to the current node.
         """
-        self.explored_paths = []
-        for curr_node in self.closed_list:
-            retraced_path = []
-            while curr_node.parent:
-                retraced_path.append(curr_node.position)
-                curr_node = curr_node.parent
-            self.explored_paths.append(retraced_path)
+        self.explored_paths = [self.expansions.retrace(i) for i in range(len(self.expansions))]
         return self.explored_paths
+
+    @classmethod
+    def find_paths(cls, grid, pairs, workers=None, diagonal=False, diagonal_cost=True, ordered=True):
+        """
+        Runs one search per (start, target) pair against the same grid, spread over a pool of worker processes.
+
+        The grid is sent to each worker once, when the worker starts, rather than with every query.
+
+        :param grid: 2D list representing the grid, shared by all queries.
+        :param pairs: An iterable of (start_pos, target_pos) tuples.
+        :param workers: The number of worker processes (default is the number of CPUs); 1 runs the queries in this process.
+        :param diagonal: Indicates if diagonal movement is allowed.
+        :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+        :param ordered: If True, results are yielded in input order, otherwise as soon as each query finishes.
+        :return: A generator of ((start_pos, target_pos), result) tuples, where result is what find_path returns.
+        """
+        pairs = list(pairs)
+        workers = workers or os.cpu_count() or 1
+        state = {"grid": grid, "solver": cls, "diagonal": diagonal, "diagonal_cost": diagonal_cost}
+        if workers == 1:
+            init_worker(state)
+            for pair in pairs:
+                yield pair, _solve_pair(pair)
+            return
+
+        # imported here, as it takes longer to import than the rest of the module
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(state,)) as executor:
+            if ordered:
+                chunksize = max(1, len(pairs) // (workers * 4))
+                yield from zip(pairs, executor.map(_solve_pair, pairs, chunksize=chunksize))
+            else:
+                futures = {executor.submit(_solve_pair, pair): pair for pair in pairs}
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+
+
+# per-process state for process pools, set once by init_worker
+worker_state = {}
+
+
+def init_worker(state):
+    """
+    The initializer of the process pools of AStar.find_paths and Landmarks.build, also called directly when they
+    run in-process.
+
+    :param state: A dict of the values the pool's tasks read from worker_state, such as the grid.
+    """
+    worker_state.clear()
+    worker_state.update(state)
+
+
+def _solve_pair(pair):
+    state = worker_state
+    alg = state["solver"](state["grid"], pair[0], pair[1], state["diagonal"], diagonal_cost=state["diagonal_cost"])
+    return alg.find_path()
+
+
+# search state flags used by CompactAStar
+UNSEEN, OPEN, CLOSED = 0, 1, 2
+
+
+class CompactAStar(AStar):
+    """
+    A* search that keeps its state in flat preallocated arrays instead of per-cell Node objects.
+
+    Cells are indexed by ``row * width + col``. The g cost, f cost, parent and open/closed flag of every cell
+    live in ``array`` buffers, and the open list holds ``(f, insertion order, index)`` tuples, so no objects
+    are allocated for successors that are thrown away as duplicates. A cell's parent is stored as the position
+    of the parent's expansion in ``expansions``, which doubles as the search tree. Expansion order, paths and
+    costs, down to an integer cost for paths without sqrt(2) steps, are the same as ``AStar``; ``get_node`` builds
+    a ``Node`` view of a searched cell for callers that need one.
+    """
+    def __init__(self, grid, start_pos, target_pos, diagonal=False, diagonal_cost=True, profile=False,
+                 heuristic=None, components=None, occupancy=None):
+        super().__init__(grid, start_pos, target_pos, diagonal, diagonal_cost=diagonal_cost, profile=profile,
+                         heuristic=heuristic, components=components, occupancy=occupancy)
+        self.height = len(grid)
+        self.width = len(grid[0])
+        size = self.height * self.width
+        # every step costs 1 unless diagonal moves cost sqrt(2)
+        if diagonal and diagonal_cost:
+            self.g_costs = array("d", [math.inf]) * size
+        else:
+            self.g_costs = array("q", [0]) * size
+        self.f_costs = array("d", [math.inf]) * size
+        self.parents = array("l", [-1]) * size
+        self.flags = bytearray(size)
+
+    def index(self, position):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :return: The flat index of the cell.
+        """
+        return position[0] * self.width + position[1]
+
+    def position(self, index):
+        """
+        :param index: The flat index of a cell.
+        :return: A tuple containing the row and column of the cell.
+        """
+        return divmod(index, self.width)
+
+    def get_node(self, position):
+        """
+        :param position: A tuple containing the row and column of a searched cell.
+        :return: A Node view of the cell, with its parent chain back to the start, or None if it was never reached.
+        """
+        index = self.index(position)
+        if self.flags[index] == UNSEEN:
+            return None
+        parent_index = self.parents[index]
+        parent = None
+        if parent_index != -1:
+            parent = self.get_node(self.position(self.expansions.cells[parent_index]))
+        g = self.g_costs[index]
+        return Node(position, g=g, h=self.f_costs[index] - g, parent=parent)
+
+    def find_path(self):
+        """
+        Finds the shortest path from the start position to the target position using the A* algorithm.
+
+        :return: A tuple containing the list of positions representing the path from the start position to the target position,
+            the time taken to find the path and the path cost.
+        """
+        start_time = time.time()
+        if self.unreachable():
+            return self.finish((None, (time.time() - start_time), math.inf), start_time)
+        stats = self.stats
+        profile = self.profile
+        on_expand, on_push = self.on_expand, self.on_push
+        generated = duplicates = 0
+        height, width = self.height, self.width
+        grid = self.grid
+        g_costs, f_costs, parents, flags = self.g_costs, self.f_costs, self.parents, self.flags
+        open_list = self.open_list
+        counter = self.counter
+        target_row, target_col = self.target_pos
+        heuristic = self.get_euclidean_distance if self.diagonal else self.get_manhattan_distance
+        if self.heuristic_function is not None:
+            heuristic = self.heuristic_function
+
+        moves = self.steps
+        masks = self.occupancy.masks if self.occupancy is not None else None
+
+        start = self.index(self.start_pos)
+        target = self.index(self.target_pos)
+        g_costs[start] = 0
+        f_costs[start] = self.get_manhattan_distance(self.start_pos, self.target_pos)
+        flags[start] = OPEN
+        open_count = 1
+        heapq.heappush(open_list, (f_costs[start], next(counter), start))
+        if on_push is not None:
+            on_push(self.start_pos, 0, f_costs[start])
+
+        self.path = []
+
+        while open_count:
+            f, _, curr = heapq.heappop(open_list)
+            # skip entries that were replaced by a cheaper version or already closed
+            if flags[curr] != OPEN or f != f_costs[curr]:
+                continue
+            if open_count > stats.peak_open:
+                stats.peak_open = open_count
+            flags[curr] = CLOSED
+            open_count -= 1
+            expansion = self.expansions.append(curr, parents[curr])
+            if on_expand is not None:
+                on_expand(divmod(curr, width), g_costs[curr])
+
+            if curr == target:
+                self.path = self.expansions.retrace(expansion)
+                self.path.append(self.start_pos)
+                self.path.reverse()
+                end_time = time.time()
+                stats.generated, stats.duplicates = generated, duplicates
+                total_cost = g_costs[curr]
+                # AStar's cost only turns into a float once the path takes a sqrt(2) step
+                if isinstance(total_cost, float) and total_cost.is_integer():
+                    total_cost = int(total_cost)
+                return self.finish((self.path, (end_time - start_time), total_cost), start_time)
+
+            if profile:
+                neighbor_time = time.perf_counter()
+            row, col = divmod(curr, width)
+            curr_g = g_costs[curr]
+            if masks is not None:
+                # only the open moves, which need no bounds or obstacle checks
+                moves = self.successor_table[masks[curr]]
+            for d_row, d_col, delta, added_g_cost in moves:
+                new_row, new_col = row + d_row, col + d_col
+                if masks is not None or 0 <= new_row < height and 0 <= new_col < width and grid[new_row][new_col] == 0:
+                    new = curr + delta
+                    state = flags[new]
+                    if state == CLOSED:
+                        duplicates += 1
+                        continue
+                    g_cost = curr_g + added_g_cost
+                    f_cost = g_cost + heuristic((new_row, new_col), (target_row, target_col))
+                    if state == UNSEEN or f_cost < f_costs[new]:
+                        if state == UNSEEN:
+                            flags[new] = OPEN
+                            open_count += 1
+                        g_costs[new] = g_cost
+                        f_costs[new] = f_cost
+                        parents[new] = expansion
+                        heapq.heappush(open_list, (f_cost, next(counter), new))
+                        generated += 1
+                        if on_push is not None:
+                            on_push((new_row, new_col), g_cost, f_cost)
+                    else:
+                        duplicates += 1
+            if profile:
+                stats.neighbor_time += time.perf_counter() - neighbor_time
+
+            if not open_count:
+                stats.generated, stats.duplicates = generated, duplicates
+                return self.finish((None, (time.time() - start_time), math.inf), start_time)
+
+
+class BidirectionalAStar(AStar):
+    """
+    A* search that grows one frontier from the start and one from the target until they meet.
+
+    Both directions are guided by balanced potentials built from the heuristic AStar uses for the current mode
+    (Manhattan, or Euclidean with diagonal movement): half the estimate to the direction's goal minus half the
+    estimate to its source. The two potentials of a cell sum to 0, so every time a node reached by one
+    direction is known to the other, the combined cost is a candidate path, and the search can stop as soon as
+    the best candidate costs no more than the sum of the two smallest f values left on the open lists: any
+    other path would have to pass through an open node of each direction. Ties on f go to the deeper node.
+
+    ``closed_list`` and ``expansions`` hold the nodes closed by both directions in expansion order, so nodes of
+    the backward search retrace to the target instead of the start.
+    """
+    def __init__(self, grid, start_pos, target_pos, diagonal=False, diagonal_cost=True, profile=False,
+                 components=None):
+        super().__init__(grid, start_pos, target_pos, diagonal, diagonal_cost=diagonal_cost, profile=profile,
+                         components=components)
+        # both open lists hold (f, -g, insertion order, node) entries
+        self.backward_open_list = []
+        self.backward_open_nodes = {}
+        self.backward_closed_set = set()
+        self.backward_expansion_order = {}
+        # position -> the best node found so far by each direction, open or closed
+        self.forward_nodes = {}
+        self.backward_nodes = {}
+
+    def distance(self, position, goal):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :param goal: A tuple containing the row and column of another cell.
+        :return: The heuristic estimate between the two positions for the current mode.
+        """
+        if self.diagonal:
+            return self.get_euclidean_distance(position, goal)
+        return self.get_manhattan_distance(position, goal)
+
+    def heuristic(self, position, goal):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :param goal: The position the search direction is heading for (the target or the start).
+        :return: The balanced potential of the cell for that direction; the two directions' potentials sum to 0.
+        """
+        source = self.start_pos if goal == self.target_pos else self.target_pos
+        return (self.distance(position, goal) - self.distance(position, source)) / 2
+
+    def top_f(self, open_list, open_nodes):
+        """
+        :param open_list: The heap of one direction.
+        :param open_nodes: The live open nodes of the same direction.
+        :return: The smallest f value among the live open nodes, dropping stale heap entries.
+        """
+        while open_list:
+            node = open_list[0][-1]
+            if open_nodes.get(node.position) is node:
+                return node.f
+            heapq.heappop(open_list)
+        return math.inf
+
+    def expand(self, node, goal, open_list, open_nodes, closed_set, nodes, other_nodes):
+        """
+        Generates the neighbors of a node for one search direction.
+
+        :return: The cheapest (cost, forward node, backward node) meeting found among the neighbors, or None.
+        """
+        best = None
+        for move in self.moves:
+            added_g_cost = 1
+            if self.diagonal and self.diagonal_cost and move[0] != 0 and move[1] != 0:
+                added_g_cost = math.sqrt(2)
+            new_pos = (node.position[0] + move[0], node.position[1] + move[1])
+            if not (0 <= new_pos[0] < len(self.grid) and 0 <= new_pos[1] < len(self.grid[0])):
+                continue
+            if self.grid[new_pos[0]][new_pos[1]] != 0:
+                continue
+            if new_pos in closed_set:
+                self.stats.duplicates += 1
+                continue
+            g_cost = node.g + added_g_cost
+            existing_node = open_nodes.get(new_pos)
+            if existing_node is not None and g_cost >= existing_node.g:
+                self.stats.duplicates += 1
+                continue
+            new_node = Node(new_pos, g=g_cost, h=self.heuristic(new_pos, goal), parent=node)
+            open_nodes[new_pos] = new_node
+            nodes[new_pos] = new_node
+            heapq.heappush(open_list, (new_node.f, -g_cost, next(self.counter), new_node))
+            self.stats.generated += 1
+            if self.on_push is not None:
+                self.on_push(new_pos, g_cost, new_node.f)
+
+            other = other_nodes.get(new_pos)
+            if other is not None and (best is None or g_cost + other.g < best[0]):
+                best = (g_cost + other.g, new_node, other)
+        return best
+
+    def find_path(self):
+        """
+        Finds the shortest path from the start position to the target position by searching from both ends.
+
+        :return: A tuple containing the list of positions representing the path from the start position to the target position,
+            the time taken to find the path and the path cost.
+        """
+        start_time = time.time()
+        if self.unreachable():
+            return self.finish((None, (time.time() - start_time), math.inf), start_time)
+        stats = self.stats
+        profile = self.profile
+        on_expand = self.on_expand
+        forward_start = Node(self.start_pos, h=self.heuristic(self.start_pos, self.target_pos))
+        backward_start = Node(self.target_pos, h=self.heuristic(self.target_pos, self.start_pos))
+        for node, open_list, open_nodes, nodes in ((forward_start, self.open_list, self.open_nodes, self.forward_nodes),
+                                                   (backward_start, self.backward_open_list, self.backward_open_nodes,
+                                                    self.backward_nodes)):
+            open_nodes[node.position] = node
+            nodes[node.position] = node
+            heapq.heappush(open_list, (node.f, 0, next(self.counter), node))
+
+        self.path = []
+        # cost of the best path found so far and the forward and backward nodes where its halves meet
+        best = (math.inf, None, None)
+
+        while True:
+            forward_f = self.top_f(self.open_list, self.open_nodes)
+            backward_f = self.top_f(self.backward_open_list, self.backward_open_nodes)
+            if best[0] <= forward_f + backward_f or math.inf in (forward_f, backward_f):
+                break
+            if len(self.open_nodes) + len(self.backward_open_nodes) > stats.peak_open:
+                stats.peak_open = len(self.open_nodes) + len(self.backward_open_nodes)
+            if profile:
+                neighbor_time = time.perf_counter()
+
+            # expand the direction with the smaller frontier
+            if len(self.open_nodes) <= len(self.backward_open_nodes):
+                node = heapq.heappop(self.open_list)[-1]
+                del self.open_nodes[node.position]
+                self.closed_set.add(node.position)
+                expansion_order = self.expansion_order
+                meeting = self.expand(node, self.target_pos, self.open_list, self.open_nodes, self.closed_set,
+                                      self.forward_nodes, self.backward_nodes)
+                other = self.backward_nodes.get(node.position)
+                if other is not None and node.g + other.g < best[0]:
+                    best = (node.g + other.g, node, other)
+            else:
+                node = heapq.heappop(self.backward_open_list)[-1]
+                del self.backward_open_nodes[node.position]
+                self.backward_closed_set.add(node.position)
+                expansion_order = self.backward_expansion_order
+                meeting = self.expand(node, self.start_pos, self.backward_open_list, self.backward_open_nodes,
+                                      self.backward_closed_set, self.backward_nodes, self.forward_nodes)
+                if meeting is not None:
+                    meeting = (meeting[0], meeting[2], meeting[1])
+                other = self.forward_nodes.get(node.position)
+                if other is not None and node.g + other.g < best[0]:
+                    best = (node.g + other.g, other, node)
+            if profile:
+                stats.neighbor_time += time.perf_counter() - neighbor_time
+            self.closed_list.append(node)
+            self.log_expansion(node, expansion_order)
+            if on_expand is not None:
+                on_expand(node.position, node.g)
+            if meeting is not None and meeting[0] < best[0]:
+                best = meeting
+
+        total_cost, forward_node, backward_node = best
+        if forward_node is None:
+            return self.finish((None, (time.time() - start_time), math.inf), start_time)
+
+        self.path = self.retrace(forward_node)
+        self.path.append(self.start_pos)
+        self.path.reverse()
+        # the backward half retraces from the meeting cell towards the target
+        node = backward_node.parent
+        while node is not None:
+            self.path.append(node.position)
+            node = node.parent
+        return self.finish((self.path, (time.time() - start_time), total_cost), start_time)
+
+
+class AnytimeAStar(AStar):
+    """
+    Anytime Repairing A* (ARA*): a series of weighted A* searches with a falling weight that reuse each other's work.
+
+    The first search runs with the initial weight and returns a path quickly. Each following search lowers the
+    weight by ``weight_step`` (or to the bound of the last path, if lower) and only re-expands the cells whose cost
+    improved since they were closed (kept in an inconsistent set) instead of starting over, until the weight reaches
+    1 or the budget runs out. Every path comes with a suboptimality bound: its cost divided by the smallest g + h
+    among the open and inconsistent cells, capped by the weight it was found with. The heuristic is
+    get_consistent_distance, which the bounds rely on.
+
+    Attributes
+    ----------
+    bound : float
+        The suboptimality bound of the best path found so far (inf before the first path, 1 once it is optimal).
+    solutions : list
+        A (cost, bound, elapsed time) tuple for every path found, in order.
+    """
+    def __init__(self, grid, start_pos, target_pos, diagonal=False, diagonal_cost=True, weight=3, weight_step=0.5,
+                 profile=False, heuristic=None, components=None):
+        super().__init__(grid, start_pos, target_pos, diagonal, diagonal_cost=diagonal_cost, profile=profile,
+                         weight=weight, heuristic=heuristic, components=components)
+        self.weight_step = weight_step
+        self.g_costs = {}
+        # position -> position of the cell it was reached from
+        self.parents = {}
+        self.h_costs = {}
+        # position -> the key of its live entry in the open list
+        self.open_keys = {}
+        # closed cells whose cost improved after they were closed, reopened by the next search
+        self.incons = set()
+        self.bound = math.inf
+        self.solutions = []
+
+    def heuristic(self, position):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :return: The (cached) consistent estimate of the cost from the cell to the target.
+        """
+        h = self.h_costs.get(position)
+        if h is None:
+            h = self.h_costs[position] = self.get_consistent_distance(position, self.target_pos)
+        return h
+
+    def push_key(self, position):
+        """
+        Queues a cell under its current weighted f value, replacing any older entry for it.
+
+        :param position: A tuple containing the row and column of a cell.
+        :return: None
+        """
+        key = self.g_costs[position] + self.weight * self.heuristic(position)
+        self.open_keys[position] = key
+        heapq.heappush(self.open_list, (key, next(self.counter), position))
+        if len(self.open_keys) > self.stats.peak_open:
+            self.stats.peak_open = len(self.open_keys)
+        if self.on_push is not None:
+            self.on_push(position, self.g_costs[position], key)
+
+    def improve_path(self, deadline=None, max_expansions=None):
+        """
+        Expands cells until no open cell can lead to a cheaper path to the target under the current weight.
+
+        :param deadline: The time.time() at which to give up, or None.
+        :param max_expansions: The total number of expansions at which to give up, or None.
+        :return: False if the budget ran out, otherwise True.
+        """
+        g_costs, parents, open_keys, closed_set = self.g_costs, self.parents, self.open_keys, self.closed_set
+        target = self.target_pos
+        on_expand = self.on_expand
+        while self.open_list:
+            key, _, position = self.open_list[0]
+            if open_keys.get(position) != key:
+                heapq.heappop(self.open_list)
+                continue
+            if g_costs.get(target, math.inf) <= key:
+                return True
+            if (deadline is not None and time.time() >= deadline) or \
+                    (max_expansions is not None and len(self.expansions) >= max_expansions):
+                return False
+            heapq.heappop(self.open_list)
+            del open_keys[position]
+            closed_set.add(position)
+            parent = parents.get(position)
+            cell = position[0] * self.expansions.width + position[1]
+            self.expansion_order[position] = self.expansions.append(
+                cell, self.expansion_order[parent] if parent is not None else -1)
+            if on_expand is not None:
+                on_expand(position, g_costs[position])
+
+            for move in self.moves:
+                new_pos = (position[0] + move[0], position[1] + move[1])
+                if not self.is_walkable(*new_pos):
+                    continue
+                added_g_cost = 1
+                if self.diagonal and self.diagonal_cost and move[0] != 0 and move[1] != 0:
+                    added_g_cost = math.sqrt(2)
+                g_cost = g_costs[position] + added_g_cost
+                if g_cost >= g_costs.get(new_pos, math.inf):
+                    self.stats.duplicates += 1
+                    continue
+                g_costs[new_pos] = g_cost
+                parents[new_pos] = position
+                if new_pos in closed_set:
+                    self.incons.add(new_pos)
+                else:
+                    self.stats.generated += 1
+                    self.push_key(new_pos)
+        return True
+
+    def iter_solutions(self, deadline=None, max_expansions=None):
+        """
+        Runs the series of searches, yielding every improved path as soon as it is found.
+
+        :param deadline: The time.time() at which to stop, or None.
+        :param max_expansions: The total number of expansions at which to stop, or None.
+        :return: A generator of (path, cost, bound) tuples with falling costs and bounds.
+        """
+        target = self.target_pos
+        self.g_costs[self.start_pos] = 0
+        self.push_key(self.start_pos)
+        while True:
+            if not self.improve_path(deadline, max_expansions) or target not in self.g_costs:
+                return
+            cost = self.g_costs[target]
+            lower_bound = min((self.g_costs[position] + self.heuristic(position)
+                               for position in itertools.chain(self.open_keys, self.incons)), default=cost)
+            self.bound = min(self.weight, cost / lower_bound) if lower_bound > 0 else 1
+
+            path = [target]
+            while path[-1] != self.start_pos:
+                path.append(self.parents[path[-1]])
+            path.reverse()
+            yield path, cost, self.bound
+
+            if self.bound <= 1:
+                return
+            # lower the weight (straight to the bound if that is lower already) and reopen the inconsistent cells
+            # along with every open cell under the new keys
+            self.weight = max(1, min(self.weight - self.weight_step, self.bound))
+            self.stats.reopened += len(self.incons)
+            positions = set(self.open_keys) | self.incons
+            self.incons = set()
+            self.closed_set = set()
+            self.open_list = []
+            self.open_keys = {}
+            for position in positions:
+                self.push_key(position)
+
+    def find_path(self, time_budget=None, expansion_budget=None):
+        """
+        Improves the path until it is optimal or the budget runs out.
+
+        :param time_budget: The number of seconds to search for, or None for no limit.
+        :param expansion_budget: The number of expansions to stop after, or None for no limit.
+        :return: A tuple containing the best list of positions found from the start position to the target position,
+            the time taken and the path cost; no path is returned if the budget runs out before the first one is found.
+            The bound of the path is left in bound.
+        """
+        start_time = time.time()
+        deadline = start_time + time_budget if time_budget is not None else None
+        self.path = []
+        best = None
+        if self.unreachable():
+            return self.finish((None, (time.time() - start_time), math.inf), start_time)
+        for path, cost, bound in self.iter_solutions(deadline, expansion_budget):
+            best = (path, cost)
+            self.solutions.append((cost, bound, time.time() - start_time))
+        if best is None:
+            return self.finish((None, (time.time() - start_time), math.inf), start_time)
+        self.path = best[0]
+        return self.finish((self.path, (time.time() - start_time), best[1]), start_time)
+
+
+class IDAStar(AStar):
+    """
+    Iterative deepening A* (IDA*) with a bounded transposition table, for searches that must fit in a fixed amount
+    of memory.
+
+    Each iteration is a depth-first search that prunes every node whose f exceeds a threshold. The threshold starts
+    at the start's heuristic and rises to at least the smallest f pruned by the previous iteration, plus a step that
+    doubles every iteration, so sqrt(2) costs and long detours take a logarithmic number of iterations. A path found
+    above the lower bound is kept while the iteration looks for a cheaper one, so the result is still optimal.
+
+    Only the current path is kept, plus a transposition table of ``max_nodes`` slots (20 bytes each) holding the
+    cheapest g each cell was reached with during the search and the iteration that last expanded it. A cell reached
+    with a worse g is skipped, and one reached with the same g only if this iteration already expanded it. Each cell
+    maps to the slot at its flat index modulo ``max_nodes`` and replaces the cell held there, so memory is fixed by
+    the table size and the path length; a table much smaller than the area searched makes the time exponential,
+    which ``benchmark.py --rss`` helps to size.
+
+    Moves, costs and the heuristic are AStar's. Expansions are counted in stats but not logged, and stats.peak_open
+    holds the deepest the path went.
+
+    Attributes
+    ----------
+    max_nodes : int
+        The number of slots in the transposition table.
+    iterations : int
+        The number of depth-first iterations run by the last search.
+    """
+    def __init__(self, grid, start_pos, target_pos, diagonal=False, diagonal_cost=True, max_nodes=65536,
+                 profile=False, heuristic=None, components=None):
+        super().__init__(grid, start_pos, target_pos, diagonal, diagonal_cost=diagonal_cost, profile=profile,
+                         heuristic=heuristic, components=components)
+        self.max_nodes = max_nodes
+        # the transposition table: a key of search number * cells + flat index, the cheapest g and the iteration
+        # that last expanded the cell, per slot
+        self.table_keys = array("q", [-1]) * max_nodes
+        self.table_costs = array("d", [0.0]) * max_nodes
+        self.table_iterations = array("i", [0]) * max_nodes
+        self.searches = 0
+        # the key of the first cell of the current search; keys below it were left by earlier searches
+        self.stamp = 0
+        self.iterations = 0
+        self.expanded_count = 0
+
+    def find_path(self):
+        """
+        Finds the shortest path from the start position to the target position with iterative deepening.
+
+        :return: A tuple containing the list of positions representing the path from the start position to the target position,
+            the time taken to find the path and the path cost. If there is no path, the list is None and the cost is inf.
+        """
+        start_time = time.time()
+        if self.unreachable():
+            return self.finish((None, (time.time() - start_time), math.inf), start_time)
+        self.expanded_count = 0
+        self.iterations = 0
+        self.stamp = self.searches * len(self.grid) * len(self.grid[0])
+        self.searches += 1
+        lower_bound = threshold = self.get_consistent_distance(self.start_pos, self.target_pos)
+        step = 1
+        while lower_bound != math.inf:
+            self.iterations += 1
+            lower_bound, total_cost = self.search(threshold, lower_bound)
+            if total_cost is not None:
+                return self.finish((self.path, (time.time() - start_time), total_cost), start_time)
+            threshold = max(lower_bound, threshold + step)
+            step *= 2
+        return self.finish((None, (time.time() - start_time), math.inf), start_time)
+
+    def search(self, threshold, lower_bound):
+        """
+        Runs one depth-first iteration, leaving the cheapest path found in path.
+
+        :param threshold: The largest f cost to search.
+        :param lower_bound: A lower bound on the cost of any path; a path costing no more is returned immediately.
+        :return: A tuple of the lower bound for the next iteration (the smallest f cost pruned, inf if none was) and
+            the path cost, or None if the target was not reached.
+        """
+        grid = self.grid
+        height, width = len(grid), len(grid[0])
+        target = self.target_pos
+        heuristic = self.get_consistent_distance
+        on_expand = self.on_expand
+        stats = self.stats
+        profile = self.profile
+        max_nodes = self.max_nodes
+        moves = [(d_row, d_col, math.sqrt(2) if self.diagonal_cost and d_row and d_col else 1)
+                 for d_row, d_col in self.moves]
+        # costs along different routes to a cell can differ by rounding, so f costs within epsilon of the
+        # threshold are searched
+        limit = threshold + 1e-9
+        next_threshold = math.inf
+        total_cost = None
+        # direct-mapped: a cell lives in slot index % max_nodes, replacing whichever cell was there
+        keys, costs, iterations = self.table_keys, self.table_costs, self.table_iterations
+        stamp, iteration = self.stamp, self.iterations
+        path = []
+        on_path = set()
+        # the unexplored successors of each cell on the path as (f, g, position), cheapest last, below the start
+        stack = [[(threshold, 0, self.start_pos)]]
+
+        while stack:
+            successors = stack[-1]
+            if not successors:
+                stack.pop()
+                if path:
+                    on_path.discard(path.pop())
+                continue
+            f, g, position = successors.pop()
+            # successors generated before a path was found may no longer beat it
+            if f > limit or position in on_path:
+                continue
+            index = position[0] * width + position[1]
+            slot = index % max_nodes
+            if keys[slot] == stamp + index:
+                best = costs[slot]
+                # a cheaper route to the cell is searched in this iteration too, and an equal one may already be
+                if best < g - 1e-9 or (best <= g + 1e-9 and iterations[slot] == iteration):
+                    stats.duplicates += 1
+                    continue
+            else:
+                keys[slot] = stamp + index
+            costs[slot] = g
+            iterations[slot] = iteration
+            if position == target:
+                self.path = path + [position]
+                total_cost = g
+                if g <= lower_bound + 1e-9:
+                    break
+                # only strictly cheaper paths are searched for from here on
+                limit = g - 1e-9
+                continue
+            path.append(position)
+            on_path.add(position)
+            self.expanded_count += 1
+            if on_expand is not None:
+                on_expand(position, g)
+
+            if profile:
+                neighbor_time = time.perf_counter()
+            successors = []
+            for d_row, d_col, cost in moves:
+                row, col = position[0] + d_row, position[1] + d_col
+                if 0 <= row < height and 0 <= col < width and grid[row][col] == 0:
+                    new_g = g + cost
+                    f = new_g + heuristic((row, col), target)
+                    if f > limit:
+                        if f < next_threshold and total_cost is None:
+                            next_threshold = f
+                        continue
+                    successors.append((f, new_g, (row, col)))
+            # popped from the end: lowest f first, deeper nodes first among equal f
+            successors.sort(key=lambda successor: (-successor[0], successor[1]))
+            stats.generated += len(successors)
+            if profile:
+                stats.neighbor_time += time.perf_counter() - neighbor_time
+            stack.append(successors)
+            if len(stack) > stats.peak_open:
+                stats.peak_open = len(stack)
+
+        return next_threshold, total_cost
+
+    def finish(self, result, start_time):
+        """
+        Fills in the totals of stats and calls the on_done hook.
+
+        :param result: The tuple find_path is about to return.
+        :param start_time: The time.time() the search started at.
+        :return: The result, unchanged.
+        """
+        self.stats.expanded = self.expanded_count
+        self.stats.time = time.time() - start_time
+        if self.on_done is not None:
+            self.on_done(result, self.stats)
+        return result
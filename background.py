@@ -0,0 +1,110 @@
+import queue
+import threading
+
+
+class SearchCancelled(Exception):
+    """
+    Raised from a search hook to abandon a search whose request has been superseded.
+    """
+
+
+class BackgroundSolver:
+    """
+        BackgroundSolver runs searches on a worker thread so the caller's loop never waits for one to finish.
+
+        Requests are queued with ``submit`` and each one supersedes every request submitted before it. The worker
+        skips queued requests that are already stale, and cancels the one it is running cooperatively: the
+        ``solve`` callable receives a ``check`` function taking the arguments of AStar's on_expand hook, which
+        raises SearchCancelled once a newer request arrives, so it can be installed as the hook directly.
+        Completed results are collected with ``poll``.
+
+        Attributes
+        ----------
+        solve : callable
+            Called as solve(request, check) on the worker thread; its return value is the result of the request.
+        generation : int
+            Bumped by every submit and cancel; only the request submitted at the current generation is solved and
+            only its result is returned by poll.
+
+        Methods
+        -------
+        submit(request)
+            Queues a request, superseding any earlier one.
+        cancel()
+            Supersedes every submitted request without queueing a new one.
+        poll()
+            Returns the (request, result) tuple of the current request once it completes, or None.
+        close()
+            Stops the worker thread.
+    """
+    def __init__(self, solve):
+        self.solve = solve
+        self.generation = 0
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, request):
+        """
+        :param request: The request to pass to solve.
+        :return: None
+        """
+        self.generation += 1
+        self.requests.put((self.generation, request))
+
+    def cancel(self):
+        """
+        :return: None
+        """
+        self.generation += 1
+
+    def run(self):
+        """
+        The worker loop: solves the newest queued request and drops the ones it superseded.
+
+        :return: None
+        """
+        while True:
+            generation, request = self.requests.get()
+            # skip straight to the newest request
+            while True:
+                try:
+                    generation, request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+            if generation is None:
+                return
+            if generation != self.generation:
+                continue
+
+            def check(*_):
+                if self.generation != generation:
+                    raise SearchCancelled
+
+            try:
+                result = self.solve(request, check)
+            except SearchCancelled:
+                continue
+            self.results.put((generation, request, result))
+
+    def poll(self):
+        """
+        :return: The (request, result) tuple of the current request if it completed since the last poll, or None.
+        """
+        latest = None
+        while True:
+            try:
+                generation, request, result = self.results.get_nowait()
+            except queue.Empty:
+                return latest
+            # a result can land just after a newer request superseded it
+            if generation == self.generation:
+                latest = request, result
+
+    def close(self):
+        """
+        :return: None
+        """
+        self.requests.put((None, None))
+        self.thread.join()
@@ -0,0 +1,736 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from alg import AnytimeAStar, AStar, BidirectionalAStar, CompactAStar
+from cooperative import CooperativePlanner
+from flowfield import FlowField
+from hierarchical import HPAStar
+from incremental import DStarLite
+from landmarks import Landmarks
+from maps import GENERATORS, load_scenarios, maze_grid, open_grid, random_grid, random_pairs
+from occupancy import OccupancyGrid
+
+# search backends selectable from the command line
+BACKENDS = {"node": AStar, "compact": CompactAStar}
+
+# movement modes of the suite, as (diagonal, diagonal_cost)
+MODES = {
+    "4-connected": (False, True),
+    "8-connected": (True, True),
+    "unit-diagonal": (True, False),
+}
+
+# result fields written to JSON and CSV reports
+FIELDS = ["map", "size", "mode", "time", "expanded", "cost", "peak_memory"]
+
+
+def run_find_path(grid, diagonal=False, diagonal_cost=True, solver=AStar, memory=False, jump_point=False, profile=False):
+    """
+    Runs A* corner to corner on the given grid.
+
+    :param grid: 2D list representing the grid.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+    :param solver: The search class to run (AStar or CompactAStar).
+    :param memory: Indicates if peak memory allocated by the search should be traced (slows the search down).
+    :param jump_point: Indicates if Jump Point Search should be used (AStar only).
+    :param profile: Indicates if the search should time its heuristic and neighbor generation.
+    :return: A dict with the elapsed wall time, the path cost, the number of expanded nodes, the peak memory in bytes
+        and the search's SearchStats as a dict.
+    """
+    if memory:
+        tracemalloc.start()
+    options = {"jump_point": True} if jump_point else {}
+    if profile:
+        options["profile"] = True
+    start_time = time.perf_counter()
+    alg = solver(grid, (0, 0), (len(grid) - 1, len(grid[0]) - 1), diagonal, diagonal_cost=diagonal_cost, **options)
+    result = alg.find_path()
+    elapsed = time.perf_counter() - start_time
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "time": elapsed,
+        "cost": result[2] if result[0] is not None else None,
+        "expanded": len(alg.expansions),
+        "peak_memory": peak,
+        "stats": alg.stats.as_dict(),
+    }
+
+
+def run_find_paths(grid, pairs, workers=None, diagonal=False, solver=AStar):
+    """
+    Runs a batch of queries through find_paths.
+
+    :param grid: 2D list representing the grid.
+    :param pairs: A list of (start_pos, target_pos) tuples.
+    :param workers: The number of worker processes.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :param solver: The search class to run (AStar or CompactAStar).
+    :return: A dict with the wall time of the batch and the summed per-query search time.
+    """
+    start_time = time.perf_counter()
+    search_time = 0
+    for _, result in solver.find_paths(grid, pairs, workers=workers, diagonal=diagonal, ordered=False):
+        search_time += result[1]
+    return {"time": time.perf_counter() - start_time, "search_time": search_time}
+
+
+def run_replans(grid, edits, diagonal=False, seed=0):
+    """
+    Toggles random cells one at a time and replans after each edit, with DStarLite and with AStar from scratch.
+
+    :param grid: 2D list representing the grid; it is modified in place.
+    :param edits: The number of cells to toggle.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :param seed: The seed used to pick the cells.
+    :return: A dict with the mean replan time and mean expansions for both planners.
+    """
+    rng = random.Random(seed)
+    start, target = (0, 0), (len(grid) - 1, len(grid[0]) - 1)
+    planner = DStarLite(grid, start, target, diagonal)
+    planner.find_path()
+    totals = {"incremental_time": 0, "incremental_expanded": 0, "astar_time": 0, "astar_expanded": 0}
+    for _ in range(edits):
+        row, col = rng.randrange(len(grid)), rng.randrange(len(grid[0]))
+        if (row, col) in (start, target):
+            continue
+        grid[row][col] = 1 - grid[row][col]
+
+        edit_time = time.perf_counter()
+        planner.set_cell(row, col, grid[row][col] == 1)
+        planner.find_path()
+        totals["incremental_time"] += time.perf_counter() - edit_time
+        totals["incremental_expanded"] += planner.expanded_count
+
+        edit_time = time.perf_counter()
+        alg = AStar(grid, start, target, diagonal)
+        alg.find_path()
+        totals["astar_time"] += time.perf_counter() - edit_time
+        totals["astar_expanded"] += len(alg.expansions)
+    return {key: value / edits for key, value in totals.items()}
+
+
+def run_hierarchical(grid, pairs, cluster_size=10, diagonal=False):
+    """
+    Builds an HPAStar abstraction and compares its answers to AStar on the given queries.
+
+    :param grid: 2D list representing the grid.
+    :param pairs: A list of (start_pos, target_pos) tuples.
+    :param cluster_size: The cluster size of the abstraction.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :return: A dict with the build time, the peak memory of the build in bytes, the abstract graph size, the total
+        query times of both searches and the mean and worst ratio of the HPAStar cost to the AStar cost.
+    """
+    # memory is traced on a separate build, since tracing slows the build down
+    tracemalloc.start()
+    HPAStar(grid, cluster_size, diagonal)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    hierarchy = HPAStar(grid, cluster_size, diagonal)
+
+    stats = {"build_time": hierarchy.build_time, "build_memory": peak, "abstract_size": hierarchy.abstract_size(),
+             "hpa_time": 0, "astar_time": 0}
+    ratios = []
+    for start, target in pairs:
+        result = hierarchy.find_path(start, target)
+        stats["hpa_time"] += result[1]
+        optimal = AStar(grid, start, target, diagonal).find_path()
+        stats["astar_time"] += optimal[1]
+        if optimal[0] is not None and optimal[2] > 0:
+            ratios.append(result[2] / optimal[2])
+    stats["mean_suboptimality"] = sum(ratios) / len(ratios) if ratios else None
+    stats["max_suboptimality"] = max(ratios, default=None)
+    return stats
+
+
+def run_flow_field(grid, starts, target, diagonal=False):
+    """
+    Routes many agents to one target with a single flow field and with one AStar search per agent.
+
+    :param grid: 2D list representing the grid.
+    :param starts: A list of start positions.
+    :param target: The shared target position.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :return: A dict with the field build time, the total read-out time and the total AStar time.
+    """
+    field = FlowField(grid, target, diagonal)
+    stats = {"build_time": field.build_time, "read_time": 0, "astar_time": 0}
+    for start in starts:
+        start_time = time.perf_counter()
+        field.find_path(start)
+        stats["read_time"] += time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        AStar(grid, start, target, diagonal).find_path()
+        stats["astar_time"] += time.perf_counter() - start_time
+    return stats
+
+
+def run_scenarios(grid, scenarios, diagonal=True, diagonal_cost=True):
+    """
+    Runs AStar on MovingAI scenarios.
+
+    :param grid: The map of the scenarios, as a 2D list or MappedGrid.
+    :param scenarios: A list of scenario dicts from load_scenarios.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+    :return: A dict with the total wall time, the total expansions, the number of scenarios solved and the mean
+        ratio of the path cost to the scenario's optimal length.
+    """
+    stats = {"time": 0, "expanded": 0, "solved": 0}
+    ratios = []
+    for scenario in scenarios:
+        start_time = time.perf_counter()
+        alg = AStar(grid, scenario["start"], scenario["target"], diagonal, diagonal_cost=diagonal_cost)
+        result = alg.find_path()
+        stats["time"] += time.perf_counter() - start_time
+        stats["expanded"] += len(alg.expansions)
+        if result[0] is not None:
+            stats["solved"] += 1
+            if scenario["optimal"] > 0:
+                ratios.append(result[2] / scenario["optimal"])
+    stats["mean_ratio"] = sum(ratios) / len(ratios) if ratios else None
+    return stats
+
+
+def run_bounded(grid, weights, budgets, diagonal=False):
+    """
+    Runs weighted A* at each weight and ARA* under each time budget, corner to corner.
+
+    :param grid: 2D list representing the grid.
+    :param weights: The weights to run weighted A* with.
+    :param budgets: The time budgets in seconds to run ARA* with.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :return: A list of dicts with the name, wall time, expansions, path cost and suboptimality bound of each run.
+    """
+    start, target = (0, 0), (len(grid) - 1, len(grid[0]) - 1)
+    runs = []
+    for weight in weights:
+        start_time = time.perf_counter()
+        alg = AStar(grid, start, target, diagonal, weight=weight)
+        result = alg.find_path()
+        runs.append({"name": f"weighted {weight}", "time": time.perf_counter() - start_time,
+                     "expanded": len(alg.expansions), "cost": result[2] if result[0] is not None else None,
+                     "bound": weight})
+    for budget in budgets:
+        start_time = time.perf_counter()
+        alg = AnytimeAStar(grid, start, target, diagonal)
+        result = alg.find_path(time_budget=budget)
+        runs.append({"name": f"ara* {budget}s", "time": time.perf_counter() - start_time,
+                     "expanded": len(alg.expansions), "cost": result[2] if result[0] is not None else None,
+                     "bound": alg.bound})
+    return runs
+
+
+def run_landmarks(grid, pairs, count=8, diagonal=False, workers=None):
+    """
+    Builds landmark tables and compares AStar with and without the ALT heuristic on the given queries.
+
+    :param grid: 2D list representing the grid.
+    :param pairs: A list of (start_pos, target_pos) tuples.
+    :param count: The number of landmarks.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :param workers: The number of worker processes used to build the tables.
+    :return: A dict with the build time and the total query time and expansions of both heuristics.
+    """
+    landmarks = Landmarks.build(grid, count, diagonal, workers=workers)
+    stats = {"build_time": landmarks.build_time}
+    for name, heuristic in (("plain", None), ("alt", landmarks.heuristic)):
+        stats[name + "_time"] = stats[name + "_expanded"] = 0
+        for start, target in pairs:
+            start_time = time.perf_counter()
+            alg = AStar(grid, start, target, diagonal, heuristic=heuristic)
+            alg.find_path()
+            stats[name + "_time"] += time.perf_counter() - start_time
+            stats[name + "_expanded"] += len(alg.expansions)
+    return stats
+
+
+def run_startup(commands, runs=10):
+    """
+    Times fresh interpreters running each command, for keeping the cold start of batch jobs low.
+
+    :param commands: A dict of name -> argument list passed to the Python interpreter.
+    :param runs: The number of times each command is run.
+    :return: A dict of name -> the median wall time in seconds.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    medians = {}
+    for name, arguments in commands.items():
+        times = []
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            subprocess.run([sys.executable, *arguments], cwd=directory, check=True, stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start_time)
+        medians[name] = statistics.median(times)
+    return medians
+
+
+# run in a fresh interpreter by run_rss: builds one map, solves it corner to corner and prints the peak RSS in
+# bytes before and after the search, with the time, cost and expansions, as JSON
+RSS_WORKER = """
+import json, resource, sys, time
+from maps import GENERATORS
+from pathfinding import create_solver
+
+def peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+name, size, seed, solver, diagonal, diagonal_cost, options = json.loads(sys.argv[1])
+grid = GENERATORS[name](size, size, seed=seed)
+grid[0][0] = grid[-1][-1] = 0
+grid_rss = peak_rss()
+start_time = time.perf_counter()
+alg = create_solver(solver, grid, (0, 0), (size - 1, size - 1), diagonal, diagonal_cost, **options)
+result = alg.find_path()
+elapsed = time.perf_counter() - start_time
+print(json.dumps({"time": elapsed, "cost": result[2] if result[0] is not None else None,
+                  "expanded": alg.stats.expanded, "grid_rss": grid_rss, "peak_rss": peak_rss()}))
+"""
+
+
+def run_rss(name, size, solvers, seed=0, diagonal=False, diagonal_cost=True):
+    """
+    Runs each solver corner to corner in a fresh interpreter and reports its peak resident set size, which unlike
+    tracemalloc counts every allocation and is what container memory limits enforce.
+
+    :param name: A key of GENERATORS.
+    :param size: The width and height of the map.
+    :param solvers: A list of (label, solver name, constructor options) tuples, solver names being keys of SOLVERS.
+    :param seed: The map seed.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+    :return: A list of dicts with the label, wall time, path cost, expansions, the peak RSS once the map was built and
+        the peak RSS after the search, in bytes.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for label, solver, options in solvers:
+        arguments = json.dumps([name, size, seed, solver, diagonal, diagonal_cost, options])
+        output = subprocess.run([sys.executable, "-c", RSS_WORKER, arguments], cwd=directory, check=True,
+                                stdout=subprocess.PIPE, text=True).stdout
+        runs.append({"name": label, **json.loads(output)})
+    return runs
+
+
+def run_occupancy(grid, diagonal=False, diagonal_cost=True, repeat=3):
+    """
+    Compares the expansion rate of AStar and CompactAStar reading neighbors from the nested lists with reading them
+    from an OccupancyGrid, corner to corner.
+
+    :param grid: 2D list representing the grid.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+    :param repeat: Timed runs per case; the fastest is kept.
+    :return: A dict with the time taken to build the OccupancyGrid, and a list of dicts with the name, wall time,
+        expansions and expansions per second of each run.
+    """
+    start_time = time.perf_counter()
+    occupancy = OccupancyGrid(grid, diagonal)
+    stats = {"build_time": time.perf_counter() - start_time, "runs": []}
+    start, target = (0, 0), (len(grid) - 1, len(grid[0]) - 1)
+    for solver in (AStar, CompactAStar):
+        for name, options in (("lists", {}), ("occupancy", {"occupancy": occupancy})):
+            best = None
+            for _ in range(repeat):
+                start_time = time.perf_counter()
+                alg = solver(grid, start, target, diagonal, diagonal_cost=diagonal_cost, **options)
+                alg.find_path()
+                elapsed = time.perf_counter() - start_time
+                best = elapsed if best is None else min(best, elapsed)
+            expanded = alg.stats.expanded
+            stats["runs"].append({"name": f"{solver.__name__} {name}", "time": best, "expanded": expanded,
+                                  "rate": expanded / best if best else None})
+    return stats
+
+
+def run_fleet(grid, count, per_station=16, diagonal=False, stay=False, weight=1, seed=0):
+    """
+    Plans a fleet of agents from distinct random starts with CooperativePlanner, in one batch, and checks the plans
+    for collisions. Targets are never picked on starts, as an agent cannot end on a cell another agent has not left.
+
+    :param grid: 2D list representing the grid.
+    :param count: The number of agents.
+    :param per_station: The number of agents sharing each target cell; ignored with stay, where every agent gets its
+        own. A target takes one arrival per time step, so crowded targets mostly measure agents waiting in line.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :param stay: Indicates if agents stay on their target after arriving.
+    :param weight: The weight of the planner's heuristic.
+    :param seed: The seed used to pick the cells.
+    :return: A dict with the wall time, agents planned per second, the mean delay over the unobstructed paths (None if
+        every agent failed), the number of agents that failed, the number of heuristic searches started, the cells
+        they closed and the time spent in them, the number of reservations, the expansions and the number of
+        collisions.
+    """
+    rng = random.Random(seed)
+    free = [(row, col) for row in range(len(grid)) for col in range(len(grid[0])) if grid[row][col] == 0]
+    cells = rng.sample(free, count + (count if stay else -(-count // per_station)))
+    starts = cells[:count]
+    targets = cells[count:] if stay else [rng.choice(cells[count:]) for _ in range(count)]
+    agents = list(zip(starts, targets))
+    start_time = time.perf_counter()
+    planner = CooperativePlanner(grid, diagonal, stay=stay, weight=weight)
+    results = planner.plan(agents)
+    elapsed = time.perf_counter() - start_time
+    heuristics, heuristic_expanded, heuristic_time = (planner.heuristic_searches, planner.heuristic_expanded,
+                                                      planner.heuristic_time)
+    # the extra cost of each planned path over the agent's path with no other agents about
+    width = len(grid[0])
+    delays = []
+    for start, target, (path, cost) in zip(starts, targets, results):
+        if path is not None:
+            start, target = start[0] * width + start[1], target[0] * width + target[1]
+            delays.append(cost - planner.heuristic(target, start).distance(start))
+    return {
+        "time": elapsed,
+        "rate": count / elapsed,
+        "delay": sum(delays) / len(delays) if delays else None,
+        "failed": sum(path is None for path, _ in results),
+        "heuristics": heuristics,
+        "heuristic_expanded": heuristic_expanded,
+        "heuristic_time": heuristic_time,
+        "reservations": len(planner.reservations),
+        "expanded": planner.stats.expanded,
+        "conflicts": len(planner.conflicts(agents, results)),
+    }
+
+
+def run_suite(sizes, map_names, mode_names, seed=0, repeat=3, solver=AStar):
+    """
+    Runs the solver corner to corner on every combination of map, size and movement mode.
+
+    Each case is timed ``repeat`` times and the fastest run is kept; peak memory is measured on one extra
+    traced run, so tracing does not slow down the timed runs.
+
+    :param sizes: The side lengths of the square maps.
+    :param map_names: The names of the map generators in maps.GENERATORS.
+    :param mode_names: The names of the movement modes in MODES.
+    :param seed: The seed passed to the map generators.
+    :param repeat: The number of timed runs of each case.
+    :param solver: The search class to run.
+    :return: A list of result dicts with the fields in FIELDS.
+    """
+    results = []
+    for map_name in map_names:
+        for size in sizes:
+            grid = GENERATORS[map_name](size, size, seed=seed)
+            for mode_name in mode_names:
+                diagonal, diagonal_cost = MODES[mode_name]
+                runs = [run_find_path(grid, diagonal, diagonal_cost, solver) for _ in range(max(1, repeat))]
+                traced = run_find_path(grid, diagonal, diagonal_cost, solver, memory=True)
+                results.append({
+                    "map": map_name,
+                    "size": size,
+                    "mode": mode_name,
+                    "time": min(run["time"] for run in runs),
+                    "expanded": runs[0]["expanded"],
+                    "cost": runs[0]["cost"],
+                    "peak_memory": traced["peak_memory"],
+                })
+    return results
+
+
+def write_results(results, path):
+    """
+    Writes suite results to a file, as CSV if the path ends in .csv and as JSON otherwise.
+
+    :param results: A list of result dicts from run_suite.
+    :param path: The file to write.
+    :return: None
+    """
+    with open(path, "w", newline="") as file:
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(file, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+        else:
+            json.dump({"python": platform.python_version(), "results": results}, file, indent=2)
+
+
+def load_results(path):
+    """
+    :param path: A JSON report written by write_results.
+    :return: The list of result dicts in the report.
+    """
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+def compare_results(results, baseline, tolerance=0.2):
+    """
+    Compares suite results with a baseline report, matching cases by map, size and mode.
+
+    A case regresses when its time grows by more than the tolerance, when it expands more nodes, or when its
+    path cost changes (which points at a correctness change rather than a performance one).
+
+    :param results: A list of result dicts from run_suite.
+    :param baseline: A list of result dicts from an earlier run.
+    :param tolerance: The allowed relative growth in time before it counts as a regression.
+    :return: A list of (result, baseline result, list of reasons) tuples for every regressed case.
+    """
+    previous = {(result["map"], result["size"], result["mode"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["map"], result["size"], result["mode"]))
+        if old is None:
+            continue
+        reasons = []
+        if result["time"] > old["time"] * (1 + tolerance):
+            reasons.append(f"time {old['time']:.4f}s -> {result['time']:.4f}s")
+        if result["expanded"] > old["expanded"]:
+            reasons.append(f"expanded {old['expanded']} -> {result['expanded']}")
+        if (result["cost"] is None) != (old["cost"] is None) or (
+                result["cost"] is not None and abs(result["cost"] - old["cost"]) > 1e-9):
+            reasons.append(f"cost {old['cost']} -> {result['cost']}")
+        if reasons:
+            regressions.append((result, old, reasons))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times AStar.find_path on seeded generated grids.")
+    parser.add_argument("--sizes", type=int, nargs="+", help="map sizes (default 500 2000, or 64 128 256 with --suite)")
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--diagonal", action="store_true")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=["node", "compact"])
+    parser.add_argument("--memory", action="store_true", help="trace peak memory instead of timing at full speed")
+    parser.add_argument("--profile", action="store_true", help="print the search counters and heuristic/neighbor timers")
+    parser.add_argument("--queries", type=int, default=0, help="run this many random queries per grid through find_paths")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--replans", type=int, default=0, help="toggle this many cells and compare replanning times")
+    parser.add_argument("--jps", action="store_true", help="compare Jump Point Search with A* on open and maze maps")
+    parser.add_argument("--hpa", type=int, default=0, help="compare HPAStar with AStar on this many random queries")
+    parser.add_argument("--cluster-size", type=int, default=10)
+    parser.add_argument("--bidirectional", action="store_true", help="compare BidirectionalAStar with AStar")
+    parser.add_argument("--agents", type=int, default=0, help="route this many agents to one target with a flow field")
+    parser.add_argument("--suite", action="store_true", help="run every map and movement mode and report the results")
+    parser.add_argument("--maps", nargs="+", choices=sorted(GENERATORS), default=list(GENERATORS))
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per suite case; the fastest is kept")
+    parser.add_argument("--output", action="append", default=[], help="write suite results to a .json or .csv file")
+    parser.add_argument("--baseline", help="compare suite results with a JSON report from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown against the baseline")
+    parser.add_argument("--weights", type=float, nargs="+",
+                        help="compare weighted A* at these weights and ARA* (with --fleet, the planner's weights)")
+    parser.add_argument("--budgets", type=float, nargs="+", default=[0.01, 0.1, 1.0], help="ARA* time budgets")
+    parser.add_argument("--landmarks", type=int, default=0, help="compare the ALT heuristic with this many landmarks")
+    parser.add_argument("--startup", action="store_true", help="time the cold start of the headless entry point")
+    parser.add_argument("--rss", action="store_true", help="compare the peak RSS and time of AStar and IDAStar in fresh processes")
+    parser.add_argument("--node-budgets", type=int, nargs="+",
+                        help="IDAStar transposition table slots for --rss (default 32 and 128 rows of the map)")
+    parser.add_argument("--occupancy", action="store_true",
+                        help="compare expansions per second with neighbors read from lists and from an OccupancyGrid")
+    parser.add_argument("--fleet", type=int, nargs="+", help="plan fleets of this many agents with CooperativePlanner")
+    parser.add_argument("--per-station", type=int, default=16, help="the number of fleet agents sharing each target")
+    parser.add_argument("--fleet-modes", nargs="+", choices=["stay", "stations"], default=["stay", "stations"],
+                        help="fleets whose agents stay on their own target (the planner's default), or leave shared "
+                             "stations on arrival")
+    parser.add_argument("--scen", help="run the scenarios of a MovingAI .scen file")
+    parser.add_argument("--map", help="the .map or binary grid file of the scenarios (default is the one the .scen names)")
+    args = parser.parse_args()
+
+    if args.startup:
+        medians = run_startup({
+            "interpreter": ["-c", "pass"],
+            "import pathfinding": ["-c", "import pathfinding"],
+            "import alg": ["-c", "import alg"],
+            "pathfinding solvers": ["-m", "pathfinding", "solvers"],
+        }, runs=args.repeat * 5)
+        for name, median in medians.items():
+            print(f"{name}: {median * 1000:.1f}ms")
+        return
+
+    if args.rss:
+        # at smaller sizes the search fits in memory the map generator already freed, and the peak does not move
+        for size in args.sizes or [1000]:
+            solvers = [("astar", "astar", {}), ("compact", "compact", {})]
+            solvers += [(f"idastar {budget}", "idastar", {"max_nodes": budget})
+                        for budget in args.node_budgets or [32 * size, 128 * size]]
+            for name in args.maps:
+                for mode in args.modes:
+                    for run in run_rss(name, size, solvers, args.seed, *MODES[mode]):
+                        print(f"{size}x{size} {name} {mode} {run['name']}: {run['time']:.3f}s, "
+                              f"{run['expanded']} expanded, cost {run['cost']}, peak RSS {run['peak_rss'] / 2 ** 20:.1f} MiB "
+                              f"(+{(run['peak_rss'] - run['grid_rss']) / 2 ** 20:.1f} MiB over the map)")
+        return
+
+    if args.fleet:
+        for size in args.sizes or [256]:
+            for name in args.maps:
+                grid = GENERATORS[name](size, size, seed=args.seed)
+                for count in args.fleet:
+                    for mode in args.fleet_modes:
+                        for weight in args.weights or [1]:
+                            stats = run_fleet(grid, count, args.per_station, args.diagonal, mode == "stay", weight,
+                                              args.seed)
+                            delay = "n/a" if stats["delay"] is None else f"{stats['delay']:.2f}"
+                            print(f"{size}x{size} {name} {count} agents, {mode}, weight {weight}: "
+                                  f"{stats['time']:.2f}s, {stats['rate']:.0f} agents/s, mean delay {delay}, "
+                                  f"{stats['failed']} failed, {stats['heuristics']} heuristic searches closing "
+                                  f"{stats['heuristic_expanded']} cells in {stats['heuristic_time']:.2f}s, "
+                                  f"{stats['reservations']} reservations, {stats['expanded']} expanded, "
+                                  f"{stats['conflicts']} collisions")
+        return
+
+    if args.occupancy:
+        for size in args.sizes or [1000, 2000]:
+            for name in args.maps:
+                grid = GENERATORS[name](size, size, seed=args.seed)
+                for mode in args.modes:
+                    stats = run_occupancy(grid, *MODES[mode], repeat=args.repeat)
+                    print(f"{size}x{size} {name} {mode}: occupancy grid built in {stats['build_time']:.3f}s")
+                    for run in stats["runs"]:
+                        print(f"  {run['name']}: {run['time']:.3f}s, {run['expanded']} expanded, "
+                              f"{run['rate']:.0f} expansions/s")
+        return
+
+    if args.landmarks:
+        for size in args.sizes or [300]:
+            for name in args.maps:
+                grid = GENERATORS[name](size, size, seed=args.seed)
+                pairs = random_pairs(grid, args.queries or 20, args.seed)
+                stats = run_landmarks(grid, pairs, args.landmarks, diagonal=args.diagonal, workers=args.workers[0])
+                print(f"{size}x{size} {name}: {args.landmarks} landmarks built in {stats['build_time']:.2f}s; "
+                      f"{len(pairs)} queries plain {stats['plain_time']:.3f}s ({stats['plain_expanded']} expanded), "
+                      f"alt {stats['alt_time']:.3f}s ({stats['alt_expanded']} expanded)")
+        return
+
+    if args.weights:
+        for size in args.sizes or [500]:
+            for name in args.maps:
+                grid = GENERATORS[name](size, size, seed=args.seed)
+                for run in run_bounded(grid, args.weights, args.budgets, diagonal=args.diagonal):
+                    print(f"{size}x{size} {name} {run['name']}: {run['time']:.3f}s, {run['expanded']} expanded, "
+                          f"cost {run['cost']}, bound {run['bound']}")
+        return
+
+    if args.scen:
+        scenarios = load_scenarios(args.scen)
+        map_path = args.map or os.path.join(os.path.dirname(args.scen), os.path.basename(scenarios[0]["map"]))
+        start_time = time.perf_counter()
+        with open_grid(map_path) as grid:
+            open_time = time.perf_counter() - start_time
+            size = f"{grid.height}x{grid.width}"
+            stats = run_scenarios(grid, scenarios)
+        # MovingAI lengths forbid cutting corners, which AStar allows, so ratios below 1 are expected
+        print(f"{map_path} ({size}) opened in {open_time:.3f}s; "
+              f"{stats['solved']}/{len(scenarios)} scenarios solved in {stats['time']:.3f}s, "
+              f"{stats['expanded']} expanded, mean cost / optimal {stats['mean_ratio']}")
+        return
+
+    if args.suite:
+        results = run_suite(args.sizes or [64, 128, 256], args.maps, args.modes, args.seed, args.repeat)
+        for result in results:
+            print(f"{result['map']} {result['size']}x{result['size']} {result['mode']}: {result['time']:.4f}s, "
+                  f"{result['expanded']} expanded, cost {result['cost']}, "
+                  f"peak {result['peak_memory'] / 2 ** 20:.2f} MiB")
+        for path in args.output:
+            write_results(results, path)
+        if args.baseline:
+            regressions = compare_results(results, load_results(args.baseline), args.tolerance)
+            for result, _, reasons in regressions:
+                print(f"REGRESSION {result['map']} {result['size']}x{result['size']} {result['mode']}: "
+                      f"{', '.join(reasons)}")
+            if regressions:
+                sys.exit(1)
+            print(f"no regressions against {args.baseline}")
+        return
+
+    args.sizes = args.sizes or [500, 2000]
+
+    if args.agents:
+        for size in args.sizes:
+            grid = random_grid(size, size, args.density, args.seed)
+            starts = [start for start, _ in random_pairs(grid, args.agents, args.seed)]
+            stats = run_flow_field(grid, starts, (size - 1, size - 1), diagonal=args.diagonal)
+            print(f"{size}x{size} {args.agents} agents: field built in {stats['build_time']:.3f}s, "
+                  f"paths read in {stats['read_time']:.3f}s vs astar {stats['astar_time']:.3f}s")
+        return
+
+    if args.bidirectional:
+        for size in args.sizes:
+            suite = (("open", random_grid(size, size, 0.05, args.seed)),
+                     ("random", random_grid(size, size, args.density, args.seed)),
+                     ("maze", maze_grid(size, size, args.seed)))
+            for name, grid in suite:
+                for solver in (AStar, BidirectionalAStar):
+                    stats = run_find_path(grid, diagonal=args.diagonal, solver=solver)
+                    print(f"{size}x{size} {name} {solver.__name__}: {stats['time']:.3f}s, "
+                          f"{stats['expanded']} expanded, cost {stats['cost']}")
+        return
+
+    if args.hpa:
+        for size in args.sizes:
+            grid = random_grid(size, size, args.density, args.seed)
+            pairs = random_pairs(grid, args.hpa, args.seed)
+            stats = run_hierarchical(grid, pairs, args.cluster_size, diagonal=args.diagonal)
+            print(f"{size}x{size} hpa: built in {stats['build_time']:.2f}s using {stats['build_memory'] / 2 ** 20:.1f} MiB, "
+                  f"{stats['abstract_size'][0]} nodes / {stats['abstract_size'][1]} edges; "
+                  f"{args.hpa} queries {stats['hpa_time']:.2f}s vs astar {stats['astar_time']:.2f}s, "
+                  f"suboptimality mean {stats['mean_suboptimality']:.3f} max {stats['max_suboptimality']:.3f}")
+        return
+
+    if args.jps:
+        for size in args.sizes:
+            for name, grid in (("open", random_grid(size, size, 0.05, args.seed)), ("maze", maze_grid(size, size, args.seed))):
+                for jump_point in (False, True):
+                    stats = run_find_path(grid, diagonal=True, jump_point=jump_point)
+                    print(f"{size}x{size} {name} {'jps' if jump_point else 'astar'}: {stats['time']:.3f}s, "
+                          f"{stats['expanded']} expanded, cost {stats['cost']}")
+        return
+
+    if args.replans:
+        for size in args.sizes:
+            grid = random_grid(size, size, args.density, args.seed)
+            stats = run_replans(grid, args.replans, diagonal=args.diagonal, seed=args.seed)
+            print(f"{size}x{size} per edit: incremental {stats['incremental_time'] * 1000:.2f}ms "
+                  f"({stats['incremental_expanded']:.0f} expanded), "
+                  f"astar {stats['astar_time'] * 1000:.2f}ms ({stats['astar_expanded']:.0f} expanded)")
+        return
+
+    if args.queries:
+        for size in args.sizes:
+            grid = random_grid(size, size, args.density, args.seed)
+            pairs = random_pairs(grid, args.queries, args.seed)
+            for backend in args.backends:
+                for workers in args.workers:
+                    stats = run_find_paths(grid, pairs, workers, diagonal=args.diagonal, solver=BACKENDS[backend])
+                    print(f"{size}x{size} {backend} x{workers}: {args.queries} queries in {stats['time']:.3f}s "
+                          f"({stats['search_time']:.3f}s searching)")
+        return
+
+    for size in args.sizes:
+        grid = random_grid(size, size, args.density, args.seed)
+        costs = set()
+        for backend in args.backends:
+            stats = run_find_path(grid, diagonal=args.diagonal, solver=BACKENDS[backend], memory=args.memory,
+                                  profile=args.profile)
+            # the backends are drop-in replacements for each other, down to the type of the cost
+            costs.add((type(stats["cost"]), stats["cost"]))
+            assert len(costs) == 1, f"the backends disagree on the cost: {sorted(costs, key=str)}"
+            line = f"{size}x{size} {backend}: {stats['time']:.3f}s, {stats['expanded']} expanded, cost {stats['cost']}"
+            if args.memory:
+                line += f", peak {stats['peak_memory'] / 2 ** 20:.1f} MiB"
+            print(line)
+            if args.profile:
+                search = stats["stats"]
+                print(f"    {search['generated']} generated, {search['duplicates']} duplicates, "
+                      f"{search['reopened']} reopened, peak open {search['peak_open']}, "
+                      f"heuristic {search['heuristic_time']:.3f}s, neighbors {search['neighbor_time']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
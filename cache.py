@@ -0,0 +1,80 @@
+from collections import OrderedDict
+
+
+class PathCache:
+    """
+        PathCache is a bounded least-recently-used cache of pathfinding results.
+
+        Keys are expected to include a grid version, so results for an old grid are never returned once the
+        version changes; ``invalidate`` drops them eagerly so they do not take up space.
+
+        Attributes
+        ----------
+        max_size : int
+            The maximum number of results kept before the least recently used one is evicted.
+        hits : int
+            The number of lookups that found a cached result.
+        misses : int
+            The number of lookups that did not find a cached result.
+        evictions : int
+            The number of results dropped because the cache was full.
+
+        Methods
+        -------
+        get(key)
+            Returns the cached result for the key, or None.
+        put(key, value)
+            Caches a result, evicting the least recently used result if the cache is full.
+        invalidate()
+            Drops every cached result.
+        stats()
+            Returns the hit, miss and eviction counters along with the current size.
+    """
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        :param key: The key the result was cached under.
+        :return: The cached result, or None if there is no result for the key.
+        """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        :param key: The key to cache the result under.
+        :param value: The result to cache.
+        :return: None
+        """
+        if self.max_size <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self):
+        """
+        :return: None
+        """
+        self.entries.clear()
+
+    def stats(self):
+        """
+        :return: A dict with the hit, miss and eviction counters and the number of cached results.
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self.entries)}
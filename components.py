@@ -0,0 +1,238 @@
+from array import array
+from collections import deque
+
+from alg import MOVES
+
+# the label of obstacle cells; free cells are labeled from 1
+BLOCKED = 0
+
+
+class ComponentIndex:
+    """
+        ComponentIndex labels the connected components of the free cells of a grid, so whether a path exists between
+        two cells is answered in O(1) without searching.
+
+        The labels are computed once by flood fill over the same MOVES as AStar, and then kept up to date as single
+        cells are toggled. Freeing a cell joins the components around it, relabeling all but the largest. Blocking
+        a cell can only split its own component, and usually does not: if the free cells around it are still
+        connected to each other within its 3x3 neighborhood nothing changes. Otherwise a search is grown from each
+        separated group of neighbors, one step at a time in turn; searches that meet are merged, and a search that
+        runs out of cells has found a new component, which is relabeled. The last search left keeps the old label,
+        so the cost of a split is bounded by the size of the smaller pieces rather than of the whole component.
+
+        Attributes
+        ----------
+        height : int
+            The number of rows.
+        width : int
+            The number of columns.
+        labels : array
+            The component label of each cell, indexed by row * width + col (BLOCKED for obstacles).
+        sizes : dict
+            The number of cells in each component, by label.
+
+        Methods
+        -------
+        label(position)
+            Returns the component label of a cell.
+        connected(position, other_position)
+            Returns True if a path exists between two cells.
+        set_cell(row, col, blocked)
+            Updates the labels after a cell was blocked or freed.
+    """
+    def __init__(self, grid, diagonal=False):
+        self.height = len(grid)
+        self.width = len(grid[0])
+        self.diagonal = diagonal
+        self.moves = MOVES if diagonal else MOVES[:4]
+        self.sizes = {}
+        self.next_label = 1
+        # free cells start out as -1 (free but unlabeled) and are labeled by flood fill
+        self.labels = array("i", [-1 if cell == 0 else BLOCKED for row in grid for cell in row])
+        for index in range(len(self.labels)):
+            if self.labels[index] == -1:
+                label = self.new_label()
+                self.sizes[label] = self.fill(index, -1, label)
+
+    def new_label(self):
+        """
+        :return: A label not used by any component.
+        """
+        label = self.next_label
+        self.next_label += 1
+        return label
+
+    def neighbors(self, index):
+        """
+        :param index: The flat index of a cell.
+        :return: The flat indices of the cells one move away that are within the grid.
+        """
+        row, col = divmod(index, self.width)
+        return [(row + d_row) * self.width + col + d_col for d_row, d_col in self.moves
+                if 0 <= row + d_row < self.height and 0 <= col + d_col < self.width]
+
+    def fill(self, index, old_label, label):
+        """
+        Relabels the cells labeled old_label that are connected to a cell.
+
+        :param index: The flat index of a cell labeled old_label.
+        :param old_label: The label to replace.
+        :param label: The new label.
+        :return: The number of cells relabeled.
+        """
+        labels = self.labels
+        labels[index] = label
+        queue = deque([index])
+        count = 0
+        while queue:
+            curr = queue.popleft()
+            count += 1
+            for neighbor in self.neighbors(curr):
+                if labels[neighbor] == old_label:
+                    labels[neighbor] = label
+                    queue.append(neighbor)
+        return count
+
+    def label(self, position):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :return: The component label of the cell, or BLOCKED for an obstacle or a cell outside the grid.
+        """
+        row, col = position
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            return BLOCKED
+        return self.labels[row * self.width + col]
+
+    def connected(self, position, other_position):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :param other_position: A tuple containing the row and column of another cell.
+        :return: True if both cells are free and a path exists between them.
+        """
+        label = self.label(position)
+        return label != BLOCKED and label == self.label(other_position)
+
+    def set_cell(self, row, col, blocked):
+        """
+        :param row: The row of the cell.
+        :param col: The column of the cell.
+        :param blocked: True if the cell is now an obstacle, False if it is now free.
+        :return: None
+        """
+        index = row * self.width + col
+        if blocked == (self.labels[index] == BLOCKED):
+            return
+        if blocked:
+            self.block(index)
+        else:
+            self.free(index)
+
+    def free(self, index):
+        """
+        :param index: The flat index of a cell that was just freed.
+        :return: None
+        """
+        labels, sizes = self.labels, self.sizes
+        # label -> a neighbor in that component
+        joined = {labels[neighbor]: neighbor for neighbor in self.neighbors(index) if labels[neighbor] != BLOCKED}
+        if not joined:
+            label = self.new_label()
+            labels[index] = label
+            sizes[label] = 1
+            return
+        # the smaller components are relabeled into the largest
+        label = max(joined, key=sizes.get)
+        labels[index] = label
+        sizes[label] += 1
+        del joined[label]
+        for old_label, neighbor in joined.items():
+            sizes[label] += self.fill(neighbor, old_label, label)
+            del sizes[old_label]
+
+    def block(self, index):
+        """
+        :param index: The flat index of a cell that was just blocked.
+        :return: None
+        """
+        labels, sizes = self.labels, self.sizes
+        label = labels[index]
+        labels[index] = BLOCKED
+        sizes[label] -= 1
+        if not sizes[label]:
+            del sizes[label]
+            return
+        groups = self.local_groups(index)
+        if len(groups) < 2:
+            return
+
+        # one search per group, grown a cell at a time in turn; owner maps each reached cell to the search that
+        # reached it, and merged searches point to the search that absorbed them
+        frontiers = {search: deque([cell]) for search, cell in enumerate(groups)}
+        owner = {cell: search for search, cell in enumerate(groups)}
+        merged = {}
+
+        def find(search):
+            while search in merged:
+                search = merged[search]
+            return search
+
+        while len(frontiers) > 1:
+            for search in list(frontiers):
+                if search not in frontiers:
+                    continue
+                frontier = frontiers[search]
+                curr = frontier.popleft()
+                for neighbor in self.neighbors(curr):
+                    if labels[neighbor] != label:
+                        continue
+                    other = owner.get(neighbor)
+                    if other is None:
+                        owner[neighbor] = search
+                        frontier.append(neighbor)
+                        continue
+                    other = find(other)
+                    if other != search:
+                        # the searches met, so their groups are still connected
+                        merged[other] = search
+                        frontier.extend(frontiers.pop(other))
+                if not frontier:
+                    # nothing left to reach: the cells of this search are cut off from the others
+                    del frontiers[search]
+                    new_label = self.new_label()
+                    cells = [cell for cell, other in owner.items() if find(other) == search]
+                    for cell in cells:
+                        labels[cell] = new_label
+                    sizes[new_label] = len(cells)
+                    sizes[label] -= len(cells)
+                    if len(frontiers) == 1:
+                        break
+
+    def local_groups(self, index):
+        """
+        :param index: The flat index of a blocked cell.
+        :return: One free neighbor of the cell from each group of its free neighbors that are connected to each
+            other without leaving the cell's 3x3 neighborhood.
+        """
+        row, col = divmod(index, self.width)
+        cells = [(neighbor // self.width - row, neighbor % self.width - col) for neighbor in self.neighbors(index)
+                 if self.labels[neighbor] != BLOCKED]
+        free = {(d_row, d_col) for d_row in (-1, 0, 1) for d_col in (-1, 0, 1)
+                if (d_row or d_col) and 0 <= row + d_row < self.height and 0 <= col + d_col < self.width
+                and self.labels[(row + d_row) * self.width + col + d_col] != BLOCKED}
+        groups = []
+        seen = set()
+        for cell in cells:
+            if cell in seen:
+                continue
+            groups.append((row + cell[0]) * self.width + col + cell[1])
+            # flood fill over the free cells of the neighborhood, without passing through its center
+            seen.add(cell)
+            stack = [cell]
+            while stack:
+                d_row, d_col = stack.pop()
+                for move in self.moves:
+                    step = (d_row + move[0], d_col + move[1])
+                    if step in free and step not in seen:
+                        seen.add(step)
+                        stack.append(step)
+        return groups
@@ -0,0 +1,419 @@
+import heapq
+import math
+import time
+
+from alg import MOVES, SearchStats, octile_distance
+from cache import PathCache
+from components import ComponentIndex
+from occupancy import MASK_MOVES, OccupancyGrid
+
+# the move code of an agent waiting where it is (or placed at its start); moves are coded by their index in MOVES
+WAIT = len(MOVES)
+
+
+class ReverseResumableAStar:
+    """
+        ReverseResumableAStar finds the exact obstacle-aware cost to a target from the cells that are asked for,
+        without searching the rest of the grid (Reverse Resumable A*, from cooperative A*).
+
+        It runs A* backwards from the target towards an origin, the start of the first agent heading there, and
+        pauses as soon as the cell asked for is closed, which makes its cost exact. A later question about a cell
+        that is not closed yet resumes the search where it paused; the priorities still aim at the origin, so cells
+        near the first agent's path are the cheapest to answer. Moves are symmetric, so the cost from the target to a
+        cell is the cost from the cell to the target. Once the open list runs out, every cell not closed is
+        unreachable.
+
+        Attributes
+        ----------
+        target : int
+            The flat index of the target.
+        closed : dict
+            The exact cost to the target of every closed cell, by flat index.
+        expanded : int
+            The number of cells closed so far.
+        time : float
+            The time spent searching.
+    """
+    def __init__(self, occupancy, successor_table, target, origin, diagonal=False, diagonal_cost=True):
+        self.masks = occupancy.masks
+        self.width = occupancy.width
+        self.successor_table = successor_table
+        self.target = target
+        self.origin = divmod(origin, self.width)
+        self.diagonal = diagonal
+        self.diagonal_cost = diagonal_cost
+        self.closed = {}
+        self.g_costs = {target: 0}
+        # (f, -g, index) entries, ties going to the deeper cell
+        estimate = octile_distance(divmod(target, self.width), self.origin, diagonal, diagonal_cost)
+        self.open_list = [(estimate, 0, target)]
+        self.expanded = 0
+        self.time = 0
+
+    def distance(self, index):
+        """
+        :param index: The flat index of a cell.
+        :return: The cost from the cell to the target, inf if there is no path, resuming the search if needed.
+        """
+        distance = self.closed.get(index)
+        if distance is not None:
+            return distance
+        start_time = time.perf_counter()
+        masks, successor_table, closed, g_costs, open_list = (self.masks, self.successor_table, self.closed,
+                                                              self.g_costs, self.open_list)
+        width, (origin_row, origin_col) = self.width, self.origin
+        # octile_distance to the origin, written out as it runs for every push: the longer side plus the shorter
+        # one at this cost per cell
+        shorter = 1 if not self.diagonal else math.sqrt(2) - 1 if self.diagonal_cost else 0
+        while open_list:
+            _, negative_g, curr = heapq.heappop(open_list)
+            if curr in closed:
+                continue
+            g = -negative_g
+            closed[curr] = g
+            del g_costs[curr]
+            self.expanded += 1
+            for _, _, delta, cost in successor_table[masks[curr]]:
+                new = curr + delta
+                new_g = g + cost
+                if new not in closed and new_g < g_costs.get(new, math.inf):
+                    g_costs[new] = new_g
+                    row, col = divmod(new, width)
+                    row, col = abs(row - origin_row), abs(col - origin_col)
+                    if row < col:
+                        row, col = col, row
+                    heapq.heappush(open_list, (new_g + row + shorter * col, -new_g, new))
+            if curr == index:
+                self.time += time.perf_counter() - start_time
+                return g
+        self.time += time.perf_counter() - start_time
+        return math.inf
+
+
+class CooperativePlanner:
+    """
+        CooperativePlanner routes many agents over one grid without collisions (cooperative A*).
+
+        Agents are planned one after another, in the order given, by A* over (cell, time) states: at every time step
+        an agent moves to a neighboring cell or waits where it is, and waiting costs as much as a straight move. The
+        cells each planned agent occupies at each time step are written to a reservation table, and later agents
+        may not enter a reserved cell at that time or swap cells with another agent. The table is one dict keyed
+        by ``t * cells + index``, so a (cell, time) entry is a single int lookup, holding the code of the move that
+        brought the agent there rather than the agent: two agents swap cells exactly when the one entering a cell
+        left by the other made the opposite move, so no agent ids are stored.
+
+        The heuristic is the exact obstacle-aware cost to the target, from a ReverseResumableAStar of the target,
+        which only searches as much of the grid as the agents heading there ask about. The searches are kept by
+        target in an LRU cache of ``max_heuristics`` entries and shared by every agent heading there, in this and
+        later batches, so a fleet with a few destinations runs a few searches. Successors come from an OccupancyGrid,
+        as in AStar. As in weighted AStar, a weight above 1 inflates the heuristic: each agent's path then costs at
+        most weight times the cheapest one around the agents before it, and dense fleets, where agents keep detouring
+        around each other, plan several times faster.
+
+        By default agents stay on their target once they arrive, so targets must differ and an agent only stops
+        on its target once no earlier agent passes through it later. With ``stay=False`` agents leave the grid on
+        arrival and may share targets. Until an agent is planned, its start is taken for good, so agents planned
+        before it go around it. Agents are not guaranteed a plan: one that cannot reach its target within
+        ``max_delay`` steps of twice its unobstructed path, or of the first time its target is free, or whose search
+        closes more than ``expansion_budget`` states, fails and stays at its start for good, which every other agent
+        then avoids. The budget bounds the time and memory of agents walled in by agents that stopped on their
+        targets, whose searches would otherwise fill the whole time window before failing. In corridors one cell
+        wide, as in mazes, agents cannot pass each other and many fail.
+
+        Attributes
+        ----------
+        grid : list
+            2D list representing the grid; the planner assumes it does not change.
+        diagonal : bool
+            Indicates if diagonal movement is allowed.
+        diagonal_cost : bool
+            Indicates if diagonal moves cost sqrt(2) instead of 1.
+        stay : bool
+            Indicates if agents stay on their target after arriving.
+        max_delay : int
+            The number of time steps an agent may lose to waiting and detours, beyond twice the length of its
+            unobstructed path or the first time its target is free, before it fails.
+        weight : float
+            The weight of the heuristic; 1 gives each agent its cheapest path around the agents before it.
+        expansion_budget : int
+            The number of (cell, time) states an agent's search may close before the agent fails.
+        reservations : dict
+            The move code of the agent occupying each (cell, time), keyed by t * cells + row * width + col.
+        heuristics : PathCache
+            The ReverseResumableAStar of each target, by target index, least recently used first out.
+        heuristic_searches : int
+            The number of heuristic searches started, counting those started again after being evicted.
+        heuristic_expanded : int
+            The number of cells the heuristic searches closed.
+        heuristic_time : float
+            The time spent in the heuristic searches.
+        stats : SearchStats
+            The counters of every search run by the planner.
+        time : float
+            The wall time of the last batch.
+
+        Methods
+        -------
+        plan(agents)
+            Plans a batch of agents against the reservations of every agent planned before.
+        reset()
+            Drops all reservations, keeping the heuristic searches.
+        conflicts(agents, results)
+            Returns the collisions between the planned agents; empty unless the planner has a bug.
+    """
+    def __init__(self, grid, diagonal=False, diagonal_cost=True, stay=True, max_delay=32, weight=1,
+                 occupancy=None, max_heuristics=64, expansion_budget=100000):
+        self.grid = grid
+        self.height = len(grid)
+        self.width = len(grid[0])
+        self.cells = self.height * self.width
+        self.diagonal = diagonal
+        self.diagonal_cost = diagonal_cost
+        self.stay = stay
+        self.max_delay = max_delay
+        self.weight = weight
+        self.expansion_budget = expansion_budget
+        if occupancy is None:
+            occupancy = OccupancyGrid(grid, diagonal)
+        elif occupancy.diagonal != diagonal:
+            raise ValueError("the occupancy grid was built for a different movement mode")
+        self.occupancy = occupancy
+        # mask -> the (index delta, cost, code of the opposite move) steps of the open moves and of waiting
+        steps = [(d_row * self.width + d_col, math.sqrt(2) if diagonal_cost and d_row != 0 and d_col != 0 else 1,
+                  MOVES.index((-d_row, -d_col))) for d_row, d_col in MOVES]
+        self.successor_table = [tuple(steps[move] for move in moves) + ((0, 1, WAIT),) for moves in MASK_MOVES]
+        # the most a single step can cost, for bounding the remaining steps by the remaining cost
+        self.max_step_cost = math.sqrt(2) if diagonal and diagonal_cost else 1
+        self.heuristics = PathCache(max_heuristics)
+        self.heuristic_searches = 0
+        self.heuristic_expanded = 0
+        self.heuristic_time = 0
+        self.stats = SearchStats()
+        self.time = 0
+        self.reset()
+
+    def reset(self):
+        """
+        :return: None
+        """
+        self.reservations = {}
+        # index -> the time from which an agent stays on the cell for good
+        self.parked = {}
+        # index -> the last time the cell is reserved, for agents waiting to stop on it
+        self.last_reserved = {}
+        # the components of the grid with the agents that failed blocked, as they never move; built at the first
+        # failure, so agents cut off by them fail without searching
+        self.components = None
+
+    def heuristic(self, target, origin):
+        """
+        :param target: The flat index of a target.
+        :param origin: The flat index of the start of the agent asking, which a new search heads for.
+        :return: The ReverseResumableAStar of the target, created on first use and shared by every agent heading there.
+        """
+        heuristic = self.heuristics.get(target)
+        if heuristic is None:
+            heuristic = ReverseResumableAStar(self.occupancy, self.occupancy.successor_table(self.diagonal_cost),
+                                              target, origin, self.diagonal, self.diagonal_cost)
+            self.heuristics.put(target, heuristic)
+            self.heuristic_searches += 1
+        return heuristic
+
+    def plan(self, agents):
+        """
+        :param agents: A list of (start_pos, target_pos) tuples, in order of priority.
+        :return: A list holding, for each agent, a tuple of its path, one position per time step including waits,
+            and its cost; the path is None and the cost inf if the agent could not be planned.
+        """
+        start_time = time.time()
+        width = self.width
+        starts = [start[0] * width + start[1] for start, _ in agents]
+        targets = [target[0] * width + target[1] for _, target in agents]
+        if len(set(starts)) != len(starts):
+            raise ValueError("two agents share a start cell")
+        # agents of earlier batches did not know these agents stand on their starts, so none may have passed there
+        if any(start in self.last_reserved for start in starts):
+            raise ValueError("an agent starts on a cell that agents of an earlier batch pass through")
+        if self.stay and len(set(targets)) != len(targets):
+            raise ValueError("two agents share a target cell, which needs stay=False")
+        parked = self.parked
+        # every agent stands on its start until it is planned
+        for start in starts:
+            parked[start] = 0
+        results = []
+        for start, target in zip(starts, targets):
+            del parked[start]
+            heuristic = self.heuristic(target, start)
+            heuristic_expanded, heuristic_time = heuristic.expanded, heuristic.time
+            path = self.search(start, target)
+            self.heuristic_expanded += heuristic.expanded - heuristic_expanded
+            self.heuristic_time += heuristic.time - heuristic_time
+            if path is None:
+                results.append((None, math.inf))
+                # the agent never leaves its start
+                self.reservations[start] = WAIT
+                self.last_reserved[start] = 0
+                parked[start] = 0
+                if self.components is None:
+                    self.components = ComponentIndex(self.grid, self.diagonal)
+                self.components.set_cell(*divmod(start, width), True)
+                continue
+            positions = [divmod(index, width) for index in path]
+            results.append((positions, self.reserve(positions)))
+        self.time = time.time() - start_time
+        self.stats.time += self.time
+        return results
+
+    def conflicts(self, agents, results):
+        """
+        :param agents: A list of (start_pos, target_pos) tuples given to plan.
+        :param results: The list plan returned for them.
+        :return: A list of (t, agent, other agent) tuples, one for each time two agents are on the same cell or swap
+            cells; agents that failed stand on their start throughout.
+        """
+        tracks = [path if path is not None else [start] for (start, _), (path, _) in zip(agents, results)]
+        stays = [self.stay or path is None for path, _ in results]
+        end = max(len(track) for track in tracks) if tracks else 0
+        conflicts = []
+        previous = {}
+        for t in range(end + 1):
+            # cell -> the agent on it at time t
+            occupied = {}
+            for agent, track in enumerate(tracks):
+                if t < len(track) or stays[agent]:
+                    cell = track[min(t, len(track) - 1)]
+                    if cell in occupied:
+                        conflicts.append((t, occupied[cell], agent))
+                    occupied[cell] = agent
+            for cell, agent in occupied.items():
+                # the agent came from the cell another agent moved into
+                came_from = tracks[agent][min(t - 1, len(tracks[agent]) - 1)] if t else cell
+                other = previous.get(cell)
+                if came_from != cell and other is not None and other != agent and occupied.get(came_from) == other:
+                    if agent < other:
+                        conflicts.append((t, agent, other))
+            previous = occupied
+        return conflicts
+
+    def reserve(self, path):
+        """
+        :param path: A list of positions, one per time step.
+        :return: The cost of the path, waits included.
+        """
+        cells, width, reservations, last_reserved = self.cells, self.width, self.reservations, self.last_reserved
+        code, cost = WAIT, 0
+        for t, (row, col) in enumerate(path):
+            if t:
+                d_row, d_col = row - path[t - 1][0], col - path[t - 1][1]
+                code = MOVES.index((d_row, d_col)) if d_row or d_col else WAIT
+                cost += math.sqrt(2) if self.diagonal_cost and d_row and d_col else 1
+            index = row * width + col
+            reservations[t * cells + index] = code
+            if last_reserved.get(index, -1) < t:
+                last_reserved[index] = t
+        if self.stay:
+            self.parked[path[-1][0] * width + path[-1][1]] = len(path) - 1
+        return cost
+
+    def search(self, start, target):
+        """
+        :param start: The flat index of the start.
+        :param target: The flat index of the target.
+        :return: The flat index of the agent's cell at each time step, or None if no plan was found.
+        """
+        cells = self.cells
+        masks, successor_table = self.occupancy.masks, self.successor_table
+        reservations, parked, stats = self.reservations, self.parked, self.stats
+        if target in parked:
+            return None
+        width = self.width
+        if self.components is not None and not self.components.connected(divmod(start, width), divmod(target, width)):
+            return None
+        heuristic = self.heuristic(target, start)
+        # the closed cells of the heuristic are read directly, and only the others resume its search
+        known, distance_to = heuristic.closed, heuristic.distance
+        start_distance = distance_to(start)
+        if start_distance == math.inf:
+            return None
+        max_step_cost = self.max_step_cost
+        # the agent can only stop on its target once nobody passes through it afterwards
+        stop_after = self.last_reserved.get(target, -1) if self.stay else -1
+
+        # the first time step from a given one at which the agent can be on its target: once stop_after has passed,
+        # and with the target not reserved
+        arrivals = {}
+
+        def arrival(earliest):
+            first = arrivals.get(earliest)
+            if first is None:
+                first = max(earliest, stop_after + 1)
+                while first * cells + target in reservations:
+                    first += 1
+                # every time step passed on the way has the same answer, so each is walked once per search
+                for step in range(earliest, first + 1):
+                    arrivals[step] = first
+            return first
+
+        # the latest time step the agent may still be moving at: detours grow with the length of the path, and
+        # waits with the time the target is taken
+        first_arrival = arrival(math.ceil(start_distance / max_step_cost - 1e-9))
+        limit = max(2 * int(start_distance), first_arrival) + self.max_delay
+
+        # (f, h, distance, t, index, g) entries; a state is keyed by t * cells + index. Each step costs at least 1,
+        # so besides the distance, the time steps left until the agent can arrive bound the cost left; this keeps
+        # agents that have to wait for their target from searching the whole time window. The many states this
+        # bound ties are taken closest to the target first, so a waiting agent moves on rather than fanning out
+        weight = self.weight
+        h = max(start_distance, first_arrival)
+        open_list = [(weight * h, h, start_distance, 0, start, 0)]
+        best_g = {start: 0}
+        parents = {start: None}
+        closed = set()
+        expansion_budget = self.expansion_budget
+        while open_list:
+            _, _, _, t, curr, g = heapq.heappop(open_list)
+            key = t * cells + curr
+            if key in closed:
+                continue
+            if len(closed) == expansion_budget:
+                return None
+            closed.add(key)
+            stats.expanded += 1
+            if curr == target and t > stop_after:
+                path = []
+                while key is not None:
+                    path.append(key % cells)
+                    key = parents[key]
+                return path[::-1]
+            if t >= limit:
+                continue
+            next_t = t + 1
+            for delta, cost, opposite in successor_table[masks[curr]]:
+                new = curr + delta
+                new_key = next_t * cells + new
+                if new_key in reservations or parked.get(new, next_t + 1) <= next_t:
+                    continue
+                # two agents may not swap cells: the agent entering this cell next may not come from the new one
+                if reservations.get(next_t * cells + curr) == opposite:
+                    continue
+                h = distance = known.get(new)
+                if h is None:
+                    h = distance = distance_to(new)
+                if h == math.inf:
+                    continue
+                earliest = next_t + math.ceil(h / max_step_cost - 1e-9)
+                if earliest <= stop_after or earliest * cells + target in reservations:
+                    earliest = arrival(earliest)
+                    if earliest - next_t > h:
+                        h = earliest - next_t
+                if earliest > limit:
+                    continue
+                new_g = g + cost
+                if new_key in closed or best_g.get(new_key, math.inf) <= new_g:
+                    stats.duplicates += 1
+                    continue
+                best_g[new_key] = new_g
+                parents[new_key] = key
+                stats.generated += 1
+                heapq.heappush(open_list, (new_g + weight * h, h, distance, next_t, new, new_g))
+        return None
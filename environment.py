@@ -1,19 +1,22 @@
+import math
+import threading
 import time
 
 import pygame
 from pygame import gfxdraw
 import sys
 
-from alg import AStar
+from alg import AStar, ExpansionLog
+from background import BackgroundSolver
+from cache import PathCache
+from flowfield import FlowField
+from incremental import DStarLite
+from pathfinding import GridModel
+from renderer import EXPLORED, OBSTACLE, PATH, START, TARGET, GridRenderer
 
-# Set up screen dimensions
+# Default board dimensions (columns, rows) and cell size in pixels; the window is only opened by run_env
 dimensions = (20, 20)
 block_size = 30
-width, height = dimensions[0] * block_size, dimensions[1] * block_size
-
-# Set up display
-screen = pygame.display.set_mode((width + 10, height + 40))
-pygame.display.set_caption('A* Board')
 
 # Define colors
 BACKGROUND_COLOR = (247, 247, 247)
@@ -43,6 +46,15 @@ class Environment:
             Indicates if diagonal movement is allowed (default is False).
         highlight_explored_path : bool, optional
             Indicates if the explored path should be highlighted during visualization (default is False).
+        cache_size : int, optional
+            Maximum number of path results kept in the path cache (default is 128).
+        jump_point : bool, optional
+            Indicates if Jump Point Search should be used when diagonal movement is allowed (default is False).
+        incremental : bool, optional
+            Indicates if paths should be repaired with a D* Lite planner instead of searched from scratch when the
+            explored path is not being highlighted (default is False).
+        dimensions : tuple, optional
+            The number of columns and rows on the board (default is the module's dimensions).
 
         Attributes:
         -----------
@@ -50,8 +62,18 @@ class Environment:
             Current starting position on the grid.
         target : tuple
             Current target position on the grid.
+        model : GridModel
+            The headless grid model holding the grid and its version.
         grid : list
-            2D list representing the grid.
+            2D list representing the grid (the model's grid).
+        grid_version : int
+            Incremented every time the grid is changed, used to key the path cache (the model's version).
+        path_cache : PathCache
+            LRU cache of path results keyed by grid version, start, target and diagonal settings.
+        planner : DStarLite
+            The incremental planner kept between edits when incremental is enabled, or None.
+        planner_lock : threading.Lock
+            Held while the planner or the grid it mirrors is changed, since the planner runs on the solver thread.
         current_placement_piece : int
             Indicates the current piece being placed (0 for start, 1 for target, 2 for obstacle).
         obstacles : list
@@ -62,10 +84,12 @@ class Environment:
             Time taken to find the path.
         diagonal : bool
             Indicates if diagonal movement is allowed.
+        jump_point : bool
+            Indicates if Jump Point Search is used for diagonal pathfinding.
         highlight_explored_path : bool
             Indicates if the explored path should be highlighted.
-        explored_path : list
-            List of explored paths during pathfinding.
+        expansions : ExpansionLog
+            The cells expanded during pathfinding, used to replay the explored path one expansion per frame.
         start_circle_outline_color : tuple
             RGB color for the start circle outline.
         target_circle_outline_color : tuple
@@ -77,22 +101,46 @@ class Environment:
         --------
         update_path():
             Calculates the path using A* algorithm and updates the path and explored path.
+        path_key():
+            Returns the cache key of the search for the current start, target, grid and settings.
+        path_request(key=None):
+            Returns the request describing the search for the current start, target, grid and settings.
+        solve_path(request, on_expand=None):
+            Runs the search described by a request and returns its result; safe to call from a worker thread.
+        apply_path(key, result):
+            Caches a search result and makes it the displayed path.
         update_obstacles(grid):
             Updates the list of obstacles based on the current grid.
+        get_flow_field(target=None):
+            Returns the cached flow field rooted at a target, computing it if the grid changed.
+        toggle_obstacle(row, col):
+            Toggles an obstacle on the grid and invalidates cached paths.
+        grid_changed():
+            Bumps the grid version and invalidates cached paths; call after mutating grid directly.
         run_env():
             Runs the environment visualization, including handling user interactions and updating the display.
 
         AI was used for the development of this class
     """
-    def __init__(self, start_pos, target_pos, diagonal=False, obstacles=None, show_time=True, diagonal_cost=True):
+    def __init__(self, start_pos, target_pos, diagonal=False, obstacles=None, show_time=True, diagonal_cost=True,
+                 cache_size=128, incremental=False, jump_point=False, dimensions=dimensions):
         if obstacles is None:
             obstacles = []
         self.start = start_pos
         self.target = target_pos
-        self.grid = [[0 for _ in range(dimensions[0])] for _ in range(dimensions[1])]
+        self.dimensions = dimensions
+        self.model = GridModel(dimensions[1], dimensions[0])
+        self.grid = self.model.grid
+        self.path_cache = PathCache(cache_size)
+        self.incremental = incremental
+        self.planner = None
+        # guards the planner and the grid it mirrors while a worker thread may be repairing the planner
+        self.planner_lock = threading.Lock()
         # 0 -> Start, 1 -> End, 2 -> Obstacle
         self.current_placement_piece = 0
         self.obstacles = obstacles or []
+        # the obstacles are placed as one batch, so the model's indexes are updated once per cell
+        self.model.set_cells((row, col, True) for row, col in self.obstacles)
         self.path = []
 
         self.time = 0
@@ -101,9 +149,14 @@ class Environment:
 
         self.diagonal = diagonal
         self.diagonal_cost = diagonal_cost
+        self.jump_point = jump_point
 
         self.highlight_explored_path = False
-        self.explored_path = []
+        self.expansions = ExpansionLog(dimensions[0])
+
+    @property
+    def grid_version(self):
+        return self.model.version
 
     def clamp(self, num, min, max):
         """
@@ -120,13 +173,113 @@ class Environment:
 
     def update_path(self):
         """
-        Updates the path using the A* algorithm.
+        Updates the path using the A* algorithm, reusing the cached result if nothing has changed.
+
+        :return: None
+        """
+        key = self.path_key()
+        cached = self.path_cache.get(key)
+        if cached is None:
+            cached = self.solve_path(self.path_request(key))
+        self.apply_path(key, cached)
+
+    def path_key(self):
+        """
+        :return: The cache key of the search for the current state, cheap enough to look up before building a request.
+        """
+        # the planner does not record its expansions, so it is only used when they are not shown
+        use_planner = self.incremental and not self.highlight_explored_path
+        return (self.grid_version, self.start, self.target, self.diagonal, self.diagonal_cost, self.jump_point,
+                use_planner)
 
+    def path_request(self, key=None):
+        """
+        :param key: The path_key of the current state, if already computed.
+        :return: A (cache key, grid, reachable, occupancy) tuple describing the search for the current state. The
+            grid and the OccupancyGrid are copies, so the request stays valid while the board is edited, and
+            reachable is False if the model's component index shows there is no path.
+        """
+        if key is None:
+            key = self.path_key()
+        reachable = self.model.connected(self.start, self.target, self.diagonal)
+        occupancy = self.model.occupancy(self.diagonal).copy()
+        return key, [row[:] for row in self.grid], reachable, occupancy
+
+    def solve_path(self, request, on_expand=None):
+        """
+        :param request: A request from path_request.
+        :param on_expand: An optional AStar on_expand hook, which may raise to abandon the search. The incremental
+            planner repairs its search in place and is not interrupted.
+        :return: A (path, time, cost, expansions) tuple; the path is None and the cost inf if there is no path.
+        """
+        (_, start, target, diagonal, diagonal_cost, jump_point, use_planner), grid, reachable, occupancy = request
+        if not reachable:
+            return None, 0, math.inf, ExpansionLog(len(grid[0]))
+        if use_planner:
+            with self.planner_lock:
+                # the planner mirrors the live grid, which toggle_obstacle keeps it in step with
+                if self.planner is None:
+                    self.planner = DStarLite(self.grid, start, target, diagonal, diagonal_cost=diagonal_cost)
+                if self.planner.target_pos != target:
+                    self.planner.move_target(target)
+                if self.planner.start_pos != start:
+                    self.planner.move_start(start)
+                return (*self.planner.find_path(), ExpansionLog(len(grid[0])))
+        alg = AStar(grid, start, target, diagonal, diagonal_cost=diagonal_cost, jump_point=jump_point,
+                    occupancy=occupancy)
+        alg.on_expand = on_expand
+        return (*alg.find_path(), alg.expansions)
+
+    def apply_path(self, key, result):
+        """
+        :param key: The cache key of the request the result was computed for.
+        :param result: A (path, time, cost, expansions) tuple from solve_path.
         :return: None
         """
-        alg = AStar(self.grid, self.start, self.target, self.diagonal, diagonal_cost=self.diagonal_cost)
-        self.path, self.time, self.cost = alg.find_path()
-        self.explored_path = alg.get_explored_paths()
+        self.path_cache.put(key, result)
+        self.path, self.time, self.cost, self.expansions = result
+
+    def get_flow_field(self, target=None):
+        """
+        :param target: The target the field is rooted at (default is the current target).
+        :return: A FlowField giving every cell's cost and next step towards the target, cached until the grid changes.
+        """
+        target = target or self.target
+        key = ("flow_field", self.grid_version, target, self.diagonal, self.diagonal_cost)
+        field = self.path_cache.get(key)
+        if field is None:
+            field = FlowField(self.grid, target, self.diagonal, diagonal_cost=self.diagonal_cost)
+            self.path_cache.put(key, field)
+        return field
+
+    def grid_changed(self):
+        """
+        Bumps the grid version and drops cached paths and the incremental planner. Must be called after mutating
+        grid directly.
+
+        :return: None
+        """
+        self.model.changed()
+        self.path_cache.invalidate()
+        with self.planner_lock:
+            self.planner = None
+
+    def toggle_obstacle(self, row, col):
+        """
+        :param row: The row of the cell to toggle.
+        :param col: The column of the cell to toggle.
+        :return: None
+        """
+        with self.planner_lock:
+            self.model.toggle(row, col)
+            # the planner only needs to repair around the toggled cell
+            if self.planner is not None:
+                self.planner.set_cell(row, col, self.grid[row][col] == 1)
+        self.path_cache.invalidate()
+        if self.grid[row][col] == 1:
+            self.obstacles.append((row, col))
+        elif (row, col) in self.obstacles:
+            self.obstacles.remove((row, col))
 
     def update_obstacles(self, grid):
         """
@@ -145,8 +298,12 @@ class Environment:
 
         :return: None
         """
-        # Initialize Pygame
+        # Initialize Pygame and open the window
         pygame.init()
+        cols, rows = self.dimensions
+        width, height = cols * block_size, rows * block_size
+        screen = pygame.display.set_mode((width + 10, height + 40))
+        pygame.display.set_caption('A* Board')
 
         font = pygame.font.Font(None, 32)
 
@@ -158,6 +315,38 @@ class Environment:
         mouse_held_down = False
         locations_changed = []
 
+        # the empty board is drawn once; after that only changed cells and the menu bar are redrawn
+        renderer = GridRenderer(rows, cols, block_size, (5, 35), BACKGROUND_COLOR, LIGHT_GRAY, {
+            EXPLORED: LIGHT_GRAY,
+            OBSTACLE: OBSTACLE_CONST_COLOR,
+            PATH: LIGHT_GRAY,
+            START: START_CONST_COLOR,
+            TARGET: TARGET_CONST_COLOR,
+        })
+        menu_rect = pygame.Rect(0, 0, width + 10, 34)
+        screen.fill(BACKGROUND_COLOR)
+        renderer.draw_all(screen)
+        pygame.display.flip()
+        last_menu_state = None
+        board_changed = True
+
+        # searches run on a worker thread; a newer edit cancels the search in flight
+        solver = BackgroundSolver(self.solve_path)
+        clock = pygame.time.Clock()
+        # the explored path advances one expansion per animation step, timed from when the animation started
+        animation_step = .05
+        animation_time = time.perf_counter()
+
+        def request_path():
+            key = self.path_key()
+            cached = self.path_cache.get(key)
+            if cached is None:
+                # the grid and occupancy are only copied for searches that will run
+                solver.submit(self.path_request(key))
+            else:
+                solver.cancel()
+                self.apply_path(key, cached)
+
         # Run the game loop
         running = True
         while running:
@@ -183,8 +372,10 @@ class Environment:
                                 self.current_placement_piece = 2
                             elif col == 3:
                                 self.highlight_explored_path = not self.highlight_explored_path
-                                self.update_path()
+                                request_path()
                                 explored_path_idx = 0
+                                animation_time = time.perf_counter()
+                                board_changed = True
 
                 elif event.type == pygame.MOUSEBUTTONUP:
                     if event.button == 1:  # Left mouse button
@@ -195,184 +386,132 @@ class Environment:
                 pos = pygame.mouse.get_pos()
                 # if user is clicking the grid
                 if pos[1] > 40:
-                    col = self.clamp((pos[0] - 5) // block_size, 0, dimensions[1] - 1)
-                    row = self.clamp((pos[1] - 35) // block_size, 0, dimensions[0] - 1)
-                    if row < dimensions[0] and col < dimensions[1] and (row, col) not in locations_changed:
+                    col = self.clamp((pos[0] - 5) // block_size, 0, cols - 1)
+                    row = self.clamp((pos[1] - 35) // block_size, 0, rows - 1)
+                    if row < rows and col < cols and (row, col) not in locations_changed:
                         locations_changed.append((row, col))
                         # depending on placement piece, updates what objects were clicked
                         if self.current_placement_piece == 2:
-                            self.grid[row][col] = (1 - self.grid[row][col])
-                            self.update_obstacles(self.grid)
+                            self.toggle_obstacle(row, col)
                         elif self.current_placement_piece == 0:
                             self.start = (row, col)
                         else:
                             self.target = (row, col)
-                        self.update_path()
+                        request_path()
                         explored_path_idx = 0
-
-            # Fill the background
-            screen.fill(BACKGROUND_COLOR)
-
-            # draws menu options
-            pygame.gfxdraw.filled_circle(
-                screen,
-                block_size // 2 + 5,
-                40 // 2 - 3,
-                block_size // 2 - 9,
-                START_CONST_COLOR,
-            )
-            pygame.gfxdraw.aacircle(
-                screen,
-                block_size // 2 + 5,
-                40 // 2 - 3,
-                block_size // 2 - 9,
-                SELECTED_OUTLINE_COLOR if self.current_placement_piece == 0 else START_CONST_COLOR,
-            )
-
-            pygame.gfxdraw.filled_circle(
-                screen,
-                block_size + block_size // 2 + 5,
-                40 // 2 - 3,
-                block_size // 2 - 9,
-                TARGET_CONST_COLOR,
-            )
-            pygame.gfxdraw.aacircle(
-                screen,
-                block_size + block_size // 2 + 5,
-                40 // 2 - 3,
-                block_size // 2 - 9,
-                SELECTED_OUTLINE_COLOR if self.current_placement_piece == 1 else TARGET_CONST_COLOR,
-            )
-
-            pygame.gfxdraw.filled_circle(
-                screen,
-                block_size * 2 + block_size // 2 + 5,
-                40 // 2 - 3,
-                block_size // 2 - 9,
-                OBSTACLE_CONST_COLOR,
-            )
-            pygame.gfxdraw.aacircle(
-                screen,
-                block_size * 2 + block_size // 2 + 5,
-                40 // 2 - 3,
-                block_size // 2 - 9,
-                SELECTED_OUTLINE_COLOR if self.current_placement_piece == 2 else OBSTACLE_CONST_COLOR,
-            )
-
-            pygame.gfxdraw.aacircle(
-                screen,
-                block_size * 3 + block_size // 2 + 5,
-                40 // 2 - 3,
-                block_size // 2 - 9,
-                SELECTED_OUTLINE_COLOR if self.highlight_explored_path else OBSTACLE_CONST_COLOR,
-            )
-
-            # Draw the chessboard blocks
-            for row in range(dimensions[1]):
-                for col in range(dimensions[0]):
-                    # draws squares
-                    rect = pygame.Rect(col * block_size + 5, row * block_size + 35, block_size, block_size)
-                    full_rect = pygame.Rect(5, 35, width, height)
-                    # Add an outline to each square
-                    pygame.draw.rect(screen, LIGHT_GRAY, full_rect, 2)
-                    pygame.draw.rect(screen, LIGHT_GRAY, rect, 1)
-
-                    # draws target, obstacles, path, and start
-                    if self.target and self.target == (row, col):
-                        pygame.gfxdraw.aacircle(
-                            screen,
-                            col * block_size + block_size // 2 + 5,
-                            row * block_size + block_size // 2 + 35,
-                            block_size // 2 - 9,
-                            (0, 255, 0),
-                        )
-                        pygame.gfxdraw.filled_circle(
-                            screen,
-                            col * block_size + block_size // 2 + 5,
-                            row * block_size + block_size // 2 + 35,
-                            block_size // 2 - 9,
-                            (0, 255, 0),
-                        )
-                    elif self.start and self.start == (row, col):
-                        pygame.gfxdraw.filled_circle(
-                            screen,
-                            col * block_size + block_size // 2 + 5,
-                            row * block_size + block_size // 2 + 35,
-                            block_size // 2 - 9,
-                            (255, 0, 0),
-                        )
-                        pygame.gfxdraw.aacircle(
-                            screen,
-                            col * block_size + block_size // 2 + 5,
-                            row * block_size + block_size // 2 + 35,
-                            block_size // 2 - 9,
-                            (255, 0, 0),
-                        )
-                    elif self.path and (row, col) in self.path and not self.highlight_explored_path:
-                        pygame.gfxdraw.filled_circle(
-                            screen,
-                            col * block_size + block_size // 2 + 5,
-                            row * block_size + block_size // 2 + 35,
-                            block_size // 2 - 9,
-                            LIGHT_GRAY,
-                        )
-                        pygame.gfxdraw.aacircle(
-                            screen,
-                            col * block_size + block_size // 2 + 5,
-                            row * block_size + block_size // 2 + 35,
-                            block_size // 2 - 9,
-                            LIGHT_GRAY,
-                        )
-                    elif self.obstacles and (row, col) in self.obstacles:
-                        pygame.gfxdraw.filled_circle(
-                            screen,
-                            col * block_size + block_size // 2 + 5,
-                            row * block_size + block_size // 2 + 35,
-                            block_size // 2 - 9,
-                            (0, 0, 0),
-                        )
-                        pygame.gfxdraw.aacircle(
-                            screen,
-                            col * block_size + block_size // 2 + 5,
-                            row * block_size + block_size // 2 + 35,
-                            block_size // 2 - 9,
-                            (0, 0, 0),
-                        )
-                    elif self.highlight_explored_path and (row, col) in self.explored_path[explored_path_idx]:
-                        pygame.gfxdraw.filled_circle(
-                            screen,
-                            col * block_size + block_size // 2 + 5,
-                            row * block_size + block_size // 2 + 35,
-                            block_size // 2 - 9,
-                            LIGHT_GRAY,
-                        )
-                        pygame.gfxdraw.aacircle(
-                            screen,
-                            col * block_size + block_size // 2 + 5,
-                            row * block_size + block_size // 2 + 35,
-                            block_size // 2 - 9,
-                            LIGHT_GRAY,
-                        )
-
-            if self.show_time:
-                # shows time taken to run
-                text = f"{self.time:.2e}"
-                text_surface = font.render(text, True, (0, 0, 0))  # True for anti-aliased text, color is black
-                screen.blit(text_surface, (width - text_surface.get_rect().width + 2, 7))
-            else:
-                text = f"{self.cost:.2f}".rstrip('0').rstrip('.')
-                text_surface = font.render(text, True, (0, 0, 0))  # True for anti-aliased text, color is black
-                screen.blit(text_surface, (width - text_surface.get_rect().width + 2, 7))
+                        animation_time = time.perf_counter()
+                        board_changed = True
+
+            # shows the latest completed search
+            completed = solver.poll()
+            if completed is not None:
+                request, result = completed
+                self.apply_path(request[0], result)
+                explored_path_idx = 0
+                animation_time = time.perf_counter()
+                board_changed = True
+
+            dirty_rects = []
+
+            # redraws the menu bar only when the selection or the displayed time or cost changed
+            menu_state = (self.current_placement_piece, self.highlight_explored_path, self.time, self.cost)
+            if menu_state != last_menu_state:
+                last_menu_state = menu_state
+                screen.fill(BACKGROUND_COLOR, menu_rect)
+
+                # draws menu options
+                pygame.gfxdraw.filled_circle(
+                    screen,
+                    block_size // 2 + 5,
+                    40 // 2 - 3,
+                    block_size // 2 - 9,
+                    START_CONST_COLOR,
+                )
+                pygame.gfxdraw.aacircle(
+                    screen,
+                    block_size // 2 + 5,
+                    40 // 2 - 3,
+                    block_size // 2 - 9,
+                    SELECTED_OUTLINE_COLOR if self.current_placement_piece == 0 else START_CONST_COLOR,
+                )
+
+                pygame.gfxdraw.filled_circle(
+                    screen,
+                    block_size + block_size // 2 + 5,
+                    40 // 2 - 3,
+                    block_size // 2 - 9,
+                    TARGET_CONST_COLOR,
+                )
+                pygame.gfxdraw.aacircle(
+                    screen,
+                    block_size + block_size // 2 + 5,
+                    40 // 2 - 3,
+                    block_size // 2 - 9,
+                    SELECTED_OUTLINE_COLOR if self.current_placement_piece == 1 else TARGET_CONST_COLOR,
+                )
+
+                pygame.gfxdraw.filled_circle(
+                    screen,
+                    block_size * 2 + block_size // 2 + 5,
+                    40 // 2 - 3,
+                    block_size // 2 - 9,
+                    OBSTACLE_CONST_COLOR,
+                )
+                pygame.gfxdraw.aacircle(
+                    screen,
+                    block_size * 2 + block_size // 2 + 5,
+                    40 // 2 - 3,
+                    block_size // 2 - 9,
+                    SELECTED_OUTLINE_COLOR if self.current_placement_piece == 2 else OBSTACLE_CONST_COLOR,
+                )
+
+                pygame.gfxdraw.aacircle(
+                    screen,
+                    block_size * 3 + block_size // 2 + 5,
+                    40 // 2 - 3,
+                    block_size // 2 - 9,
+                    SELECTED_OUTLINE_COLOR if self.highlight_explored_path else OBSTACLE_CONST_COLOR,
+                )
+
+                if self.show_time:
+                    # shows time taken to run
+                    text = f"{self.time:.2e}"
+                    text_surface = font.render(text, True, (0, 0, 0))  # True for anti-aliased text, color is black
+                    screen.blit(text_surface, (width - text_surface.get_rect().width + 2, 7))
+                else:
+                    text = f"{self.cost:.2f}".rstrip('0').rstrip('.')
+                    text_surface = font.render(text, True, (0, 0, 0))  # True for anti-aliased text, color is black
+                    screen.blit(text_surface, (width - text_surface.get_rect().width + 2, 7))
+
+                dirty_rects.append(menu_rect)
+
+            # redraws only the cells whose state changed
+            if board_changed:
+                board_changed = False
+                explored_cells = ()
+                if self.highlight_explored_path and len(self.expansions):
+                    explored_cells = self.expansions.retrace(explored_path_idx)
+                path_cells = self.path if self.path and not self.highlight_explored_path else ()
+                dirty_rects += renderer.update(screen, self.start, self.target, path_cells, self.obstacles,
+                                               explored_cells)
 
             # Update the display
-            pygame.display.flip()
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
 
-            # ticks the explored path on each frame
+            # ticks the explored path once for every animation step that has elapsed
             if self.highlight_explored_path and explored_path_idx != -1:
-                time.sleep(.05)
-                explored_path_idx += 1
-                if explored_path_idx >= len(self.explored_path):
-                    explored_path_idx = -1
+                steps = int((time.perf_counter() - animation_time) / animation_step)
+                if steps:
+                    animation_time += steps * animation_step
+                    explored_path_idx += steps
+                    if explored_path_idx >= len(self.expansions):
+                        explored_path_idx = -1
+                    board_changed = True
+
+            clock.tick(60)
+
+        solver.close()
 
         # Quit Pygame
         pygame.quit()
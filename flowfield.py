@@ -0,0 +1,156 @@
+import heapq
+import math
+import time
+from array import array
+
+from alg import MOVES
+
+# marks cells of the direction field that have no next step (the target, obstacles and unreachable cells)
+NO_DIRECTION = 255
+
+
+class FlowField:
+    """
+        FlowField holds the cost to a target from every cell of a grid and the next step to take from each cell.
+
+        The field is computed once, by a wavefront (breadth-first) pass when every move costs 1 or by Dijkstra
+        when diagonal moves cost sqrt(2), searching outwards from the target over the same MOVES as AStar.
+        Moves are symmetric, so the cost from the target to a cell is also the cost from the cell to the
+        target. Any number of agents heading for the target can then read their path out in O(path length).
+
+        Attributes
+        ----------
+        target_pos : tuple
+            The target the field is rooted at.
+        distances : array
+            The cost to the target from each cell, indexed by row * width + col (inf when unreachable).
+        directions : bytearray
+            The index into MOVES of the next step from each cell, or NO_DIRECTION.
+        build_time : float
+            The time taken to compute the field.
+
+        Methods
+        -------
+        distance(position)
+            Returns the cost from a cell to the target.
+        next_step(position)
+            Returns the next cell on a shortest path from a cell to the target.
+        find_path(start_pos)
+            Reads out the path from a cell, in the same shape as AStar.find_path.
+    """
+    def __init__(self, grid, target_pos, diagonal=False, diagonal_cost=True):
+        self.height = len(grid)
+        self.width = len(grid[0])
+        self.target_pos = target_pos
+        self.diagonal = diagonal
+        self.diagonal_cost = diagonal_cost
+        self.moves = MOVES if diagonal else MOVES[:4]
+        size = self.height * self.width
+        self.distances = array("d", [math.inf]) * size
+        self.directions = bytearray([NO_DIRECTION]) * size
+
+        start_time = time.time()
+        if grid[target_pos[0]][target_pos[1]] == 0:
+            if diagonal and diagonal_cost:
+                self.build_dijkstra(grid)
+            else:
+                self.build_wavefront(grid)
+        self.build_time = time.time() - start_time
+
+    def reverse_moves(self):
+        """
+        :return: A list of (d_row, d_col, index of the opposite move in MOVES) tuples for the current mode.
+        """
+        return [(d_row, d_col, MOVES.index((-d_row, -d_col))) for d_row, d_col in self.moves]
+
+    def build_wavefront(self, grid):
+        """
+        Fills the field one layer of equal cost at a time; only valid when every move costs 1.
+
+        :param grid: 2D list representing the grid.
+        :return: None
+        """
+        height, width = self.height, self.width
+        distances, directions = self.distances, self.directions
+        moves = self.reverse_moves()
+        target = self.target_pos[0] * width + self.target_pos[1]
+        distances[target] = 0
+        frontier = [target]
+        cost = 0
+        while frontier:
+            cost += 1
+            next_frontier = []
+            for index in frontier:
+                row, col = divmod(index, width)
+                for d_row, d_col, reverse in moves:
+                    new_row, new_col = row + d_row, col + d_col
+                    if 0 <= new_row < height and 0 <= new_col < width and grid[new_row][new_col] == 0:
+                        new = new_row * width + new_col
+                        if distances[new] == math.inf:
+                            distances[new] = cost
+                            directions[new] = reverse
+                            next_frontier.append(new)
+            frontier = next_frontier
+
+    def build_dijkstra(self, grid):
+        """
+        Fills the field in order of increasing cost, for diagonal moves that cost sqrt(2).
+
+        :param grid: 2D list representing the grid.
+        :return: None
+        """
+        height, width = self.height, self.width
+        distances, directions = self.distances, self.directions
+        moves = [(d_row, d_col, reverse, math.sqrt(2) if d_row != 0 and d_col != 0 else 1)
+                 for d_row, d_col, reverse in self.reverse_moves()]
+        target = self.target_pos[0] * width + self.target_pos[1]
+        distances[target] = 0
+        open_list = [(0, target)]
+        while open_list:
+            cost, index = heapq.heappop(open_list)
+            if cost > distances[index]:
+                continue
+            row, col = divmod(index, width)
+            for d_row, d_col, reverse, added_cost in moves:
+                new_row, new_col = row + d_row, col + d_col
+                if 0 <= new_row < height and 0 <= new_col < width and grid[new_row][new_col] == 0:
+                    new = new_row * width + new_col
+                    new_cost = cost + added_cost
+                    if new_cost < distances[new]:
+                        distances[new] = new_cost
+                        directions[new] = reverse
+                        heapq.heappush(open_list, (new_cost, new))
+
+    def distance(self, position):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :return: The cost of a shortest path from the cell to the target, or inf if there is none.
+        """
+        return self.distances[position[0] * self.width + position[1]]
+
+    def next_step(self, position):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :return: The next cell on a shortest path to the target, or None at the target or an unreachable cell.
+        """
+        direction = self.directions[position[0] * self.width + position[1]]
+        if direction == NO_DIRECTION:
+            return None
+        return position[0] + MOVES[direction][0], position[1] + MOVES[direction][1]
+
+    def find_path(self, start_pos):
+        """
+        :param start_pos: The start position.
+        :return: A tuple containing the list of positions representing the path from the start position to the target position,
+            the time taken to read it out and the path cost.
+        """
+        start_time = time.time()
+        cost = self.distance(start_pos)
+        if cost == math.inf:
+            return None, (time.time() - start_time), math.inf
+        path = [start_pos]
+        position = start_pos
+        while position != self.target_pos:
+            position = self.next_step(position)
+            path.append(position)
+        return path, (time.time() - start_time), cost
@@ -0,0 +1,378 @@
+import heapq
+import itertools
+import math
+import time
+
+from alg import MOVES, AStar, octile_distance
+
+
+class HPAStar:
+    """
+        HPAStar answers long queries on an abstract graph built over square clusters of the grid (HPA*).
+
+        The grid is split into clusters of ``cluster_size`` x ``cluster_size`` cells. Free cell pairs that cross a
+        cluster border are grouped into entrances, each contributing one or two transition nodes, and the
+        cost between every pair of transition nodes inside a cluster is precomputed with a search bounded to that
+        cluster. A query links the start and target to the transitions of their clusters, searches the abstract
+        graph, then refines each abstract edge into cells with ``AStar``. Paths are near-optimal: they may be
+        slightly longer than the ``AStar`` path because they pass through transition cells. Queries between the
+        same or neighboring clusters are answered with ``AStar`` directly.
+
+        Attributes
+        ----------
+        grid : list
+            2D list representing the grid; change cells through set_cell so the abstraction stays in sync.
+        cluster_size : int
+            The width and height of a cluster in cells.
+        diagonal : bool
+            Indicates if diagonal movement is allowed.
+        diagonal_cost : bool
+            Indicates if diagonal moves cost sqrt(2) instead of 1.
+        build_time : float
+            The time taken to build the abstraction.
+
+        Methods
+        -------
+        set_cell(row, col, blocked)
+            Changes a cell and rebuilds the abstraction of its cluster.
+        find_path(start_pos, target_pos)
+            Finds a path using the abstract graph and returns it in the same shape as AStar.find_path.
+        abstract_size()
+            Returns the number of abstract nodes and edges.
+    """
+    def __init__(self, grid, cluster_size=10, diagonal=False, diagonal_cost=True):
+        self.grid = grid
+        self.height = len(grid)
+        self.width = len(grid[0])
+        self.cluster_size = cluster_size
+        self.diagonal = diagonal
+        self.diagonal_cost = diagonal_cost
+        self.moves = []
+        for move in (MOVES if diagonal else MOVES[:4]):
+            added_g_cost = 1
+            if diagonal and diagonal_cost and move[0] != 0 and move[1] != 0:
+                added_g_cost = math.sqrt(2)
+            self.moves.append((move[0], move[1], added_g_cost))
+        self.cluster_rows = -(-self.height // cluster_size)
+        self.cluster_cols = -(-self.width // cluster_size)
+
+        # (cluster, cluster) -> list of (cell in first cluster, cell in second cluster, cost) transitions
+        self.entrances = {}
+        # transition cell -> {transition cell in a neighboring cluster: cost}
+        self.inter_edges = {}
+        # cluster -> {transition cell: {transition cell in the same cluster: cost}}
+        self.intra_edges = {}
+
+        start_time = time.time()
+        for cluster in self.clusters():
+            for other in self.neighbor_clusters(cluster):
+                if cluster < other:
+                    self.build_entrances(cluster, other)
+        for cluster in self.clusters():
+            self.build_intra_edges(cluster)
+        self.build_time = time.time() - start_time
+
+    def clusters(self):
+        """
+        :return: An iterator over all (cluster row, cluster col) tuples.
+        """
+        return itertools.product(range(self.cluster_rows), range(self.cluster_cols))
+
+    def cluster_of(self, position):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :return: The (cluster row, cluster col) tuple of the cluster containing the cell.
+        """
+        return position[0] // self.cluster_size, position[1] // self.cluster_size
+
+    def cluster_bounds(self, cluster):
+        """
+        :param cluster: A (cluster row, cluster col) tuple.
+        :return: The (first row, last row + 1, first col, last col + 1) cell bounds of the cluster.
+        """
+        size = self.cluster_size
+        return (cluster[0] * size, min((cluster[0] + 1) * size, self.height),
+                cluster[1] * size, min((cluster[1] + 1) * size, self.width))
+
+    def neighbor_clusters(self, cluster):
+        """
+        :param cluster: A (cluster row, cluster col) tuple.
+        :return: The clusters a move can cross into from the cluster (including corners when diagonal).
+        """
+        result = []
+        for d_row, d_col, _ in self.moves:
+            other = (cluster[0] + d_row, cluster[1] + d_col)
+            if 0 <= other[0] < self.cluster_rows and 0 <= other[1] < self.cluster_cols:
+                result.append(other)
+        return result
+
+    def is_free(self, row, col):
+        return self.grid[row][col] == 0
+
+    def transition_cost(self, first, second):
+        if first[0] != second[0] and first[1] != second[1] and self.diagonal_cost:
+            return math.sqrt(2)
+        return 1
+
+    def build_entrances(self, cluster, other):
+        """
+        Finds the transitions across the border between two neighboring clusters.
+
+        Straight crossings are grouped into maximal runs of free cell pairs; runs shorter than 6 cells get one
+        transition in the middle and longer runs get one at each end. Diagonal crossings that no run covers
+        get a transition of their own, so no crossing is lost.
+
+        :param cluster: A (cluster row, cluster col) tuple.
+        :param other: A neighboring cluster with other > cluster.
+        :return: None
+        """
+        transitions = []
+        d_row, d_col = other[0] - cluster[0], other[1] - cluster[1]
+        top, bottom, left, right = self.cluster_bounds(cluster)
+        if d_row != 0 and d_col != 0:
+            # corner crossing between diagonally adjacent clusters
+            first = (bottom - 1, left if d_col < 0 else right - 1)
+            second = (first[0] + 1, first[1] + d_col)
+            if self.is_free(*first) and self.is_free(*second):
+                transitions.append((first, second, self.transition_cost(first, second)))
+        else:
+            if d_row == 1:
+                pairs = [((bottom - 1, col), (bottom, col)) for col in range(left, right)]
+            else:
+                pairs = [((row, right - 1), (row, right)) for row in range(top, bottom)]
+            open_pairs = [self.is_free(*first) and self.is_free(*second) for first, second in pairs]
+
+            run_start = None
+            covered = set()
+            for i in range(len(pairs) + 1):
+                if i < len(pairs) and open_pairs[i]:
+                    if run_start is None:
+                        run_start = i
+                    continue
+                if run_start is not None:
+                    ends = [(run_start + i - 1) // 2] if i - run_start < 6 else [run_start, i - 1]
+                    for end in ends:
+                        transitions.append((pairs[end][0], pairs[end][1], 1))
+                    covered.update(cell for pair in pairs[run_start:i] for cell in pair)
+                    run_start = None
+
+            if self.diagonal:
+                for i, (first, _) in enumerate(pairs):
+                    for j in (i - 1, i + 1):
+                        if 0 <= j < len(pairs):
+                            second = pairs[j][1]
+                            if first not in covered and second not in covered and \
+                                    self.is_free(*first) and self.is_free(*second):
+                                transitions.append((first, second, self.transition_cost(first, second)))
+
+        self.entrances[(cluster, other)] = transitions
+        for first, second, cost in transitions:
+            self.inter_edges.setdefault(first, {})[second] = cost
+            self.inter_edges.setdefault(second, {})[first] = cost
+
+    def remove_entrances(self, cluster, other):
+        """
+        :param cluster: A (cluster row, cluster col) tuple.
+        :param other: A neighboring cluster with other > cluster.
+        :return: None
+        """
+        for first, second, _ in self.entrances.pop((cluster, other), []):
+            for a, b in ((first, second), (second, first)):
+                edges = self.inter_edges.get(a)
+                if edges is not None:
+                    edges.pop(b, None)
+                    if not edges:
+                        del self.inter_edges[a]
+
+    def cluster_transitions(self, cluster):
+        """
+        :param cluster: A (cluster row, cluster col) tuple.
+        :return: The set of transition cells that lie in the cluster.
+        """
+        result = set()
+        for other in self.neighbor_clusters(cluster):
+            key = (cluster, other) if cluster < other else (other, cluster)
+            for first, second, _ in self.entrances.get(key, []):
+                result.add(first if self.cluster_of(first) == cluster else second)
+        return result
+
+    def cluster_search(self, source, cluster, targets=None):
+        """
+        Runs Dijkstra from a cell without leaving the cluster.
+
+        :param source: A tuple containing the row and column of a free cell in the cluster.
+        :param cluster: The cluster the search is bounded to.
+        :param targets: An optional set of cells; the search stops once all of them have been settled.
+        :return: A dict of cell -> cost for the settled cells.
+        """
+        top, bottom, left, right = self.cluster_bounds(cluster)
+        grid = self.grid
+        distances = {source: 0}
+        settled = {}
+        remaining = set(targets) if targets is not None else None
+        open_list = [(0, source)]
+        while open_list:
+            cost, (row, col) = heapq.heappop(open_list)
+            if (row, col) in settled:
+                continue
+            settled[(row, col)] = cost
+            if remaining is not None:
+                remaining.discard((row, col))
+                if not remaining:
+                    break
+            for d_row, d_col, added_g_cost in self.moves:
+                new_row, new_col = row + d_row, col + d_col
+                if top <= new_row < bottom and left <= new_col < right and grid[new_row][new_col] == 0:
+                    new_cost = cost + added_g_cost
+                    if new_cost < distances.get((new_row, new_col), math.inf):
+                        distances[(new_row, new_col)] = new_cost
+                        heapq.heappush(open_list, (new_cost, (new_row, new_col)))
+        return settled
+
+    def build_intra_edges(self, cluster):
+        """
+        Precomputes the cost between every pair of transition cells inside a cluster.
+
+        :param cluster: A (cluster row, cluster col) tuple.
+        :return: None
+        """
+        transitions = sorted(self.cluster_transitions(cluster))
+        edges = {transition: {} for transition in transitions}
+        for i, transition in enumerate(transitions):
+            # costs are symmetric, so each search only needs to reach the transitions after this one
+            remaining = set(transitions[i + 1:])
+            if not remaining:
+                break
+            distances = self.cluster_search(transition, cluster, remaining)
+            for other in remaining:
+                if other in distances:
+                    edges[transition][other] = distances[other]
+                    edges[other][transition] = distances[other]
+        self.intra_edges[cluster] = edges
+
+    def set_cell(self, row, col, blocked):
+        """
+        Changes a cell and rebuilds the entrances of its cluster and the intra-cluster edges that depend on them.
+
+        :param row: The row of the cell to change.
+        :param col: The column of the cell to change.
+        :param blocked: True to place an obstacle on the cell, False to clear it.
+        :return: None
+        """
+        self.grid[row][col] = 1 if blocked else 0
+        cluster = self.cluster_of((row, col))
+        neighbors = self.neighbor_clusters(cluster)
+        for other in neighbors:
+            key = (cluster, other) if cluster < other else (other, cluster)
+            self.remove_entrances(*key)
+            self.build_entrances(*key)
+        for affected in [cluster] + neighbors:
+            self.build_intra_edges(affected)
+
+    def abstract_size(self):
+        """
+        :return: A tuple of the number of abstract nodes and the number of abstract edges (counted once each way).
+        """
+        nodes = set(self.inter_edges)
+        edges = sum(len(edges) for edges in self.inter_edges.values())
+        for cluster_edges in self.intra_edges.values():
+            nodes.update(cluster_edges)
+            edges += sum(len(edges) for edges in cluster_edges.values())
+        return len(nodes), edges
+
+    def heuristic(self, position, target_pos):
+        return octile_distance(position, target_pos, self.diagonal, self.diagonal_cost)
+
+    def link(self, position):
+        """
+        :param position: A tuple containing the row and column of a free cell.
+        :return: A dict of transition cell -> cost for the transitions of the cell's cluster it can reach inside the cluster.
+        """
+        cluster = self.cluster_of(position)
+        transitions = self.cluster_transitions(cluster)
+        distances = self.cluster_search(position, cluster, transitions)
+        return {other: cost for other, cost in distances.items() if other in transitions and other != position}
+
+    def find_abstract_path(self, start_pos, target_pos):
+        """
+        Searches the abstract graph with the start and target temporarily linked into it.
+
+        :param start_pos: The start position.
+        :param target_pos: The target position.
+        :return: The list of abstract nodes from the start to the target, or None if the target is unreachable.
+        """
+        start_edges = self.link(start_pos)
+        # the grid is undirected, so the costs from the target to its cluster's transitions are also the costs back
+        target_edges = self.link(target_pos)
+        if self.cluster_of(start_pos) == self.cluster_of(target_pos):
+            direct = self.cluster_search(start_pos, self.cluster_of(target_pos), {target_pos})
+            if target_pos in direct:
+                start_edges[target_pos] = direct[target_pos]
+
+        counter = itertools.count()
+        g_costs = {start_pos: 0}
+        parents = {start_pos: None}
+        closed = set()
+        open_list = [(self.heuristic(start_pos, target_pos), next(counter), start_pos)]
+        while open_list:
+            _, _, curr = heapq.heappop(open_list)
+            if curr in closed:
+                continue
+            closed.add(curr)
+            if curr == target_pos:
+                path = []
+                while curr is not None:
+                    path.append(curr)
+                    curr = parents[curr]
+                path.reverse()
+                return path
+
+            if curr == start_pos:
+                intra = start_edges
+            else:
+                intra = self.intra_edges[self.cluster_of(curr)].get(curr, {})
+            edges = itertools.chain(self.inter_edges.get(curr, {}).items(), intra.items())
+            if curr in target_edges:
+                edges = itertools.chain(edges, ((target_pos, target_edges[curr]),))
+            for neighbor, cost in edges:
+                if neighbor in closed:
+                    continue
+                g_cost = g_costs[curr] + cost
+                if g_cost < g_costs.get(neighbor, math.inf):
+                    g_costs[neighbor] = g_cost
+                    parents[neighbor] = curr
+                    heapq.heappush(open_list, (g_cost + self.heuristic(neighbor, target_pos), next(counter), neighbor))
+        return None
+
+    def find_path(self, start_pos, target_pos):
+        """
+        Finds a path on the abstract graph and refines each abstract edge into cells with AStar.
+
+        :param start_pos: The start position.
+        :param target_pos: The target position.
+        :return: A tuple containing the list of positions representing the path from the start position to the target position,
+            the time taken to find the path and the path cost.
+        """
+        start_time = time.time()
+        if not self.is_free(*start_pos) or not self.is_free(*target_pos):
+            return None, (time.time() - start_time), math.inf
+        start_cluster, target_cluster = self.cluster_of(start_pos), self.cluster_of(target_pos)
+        if abs(start_cluster[0] - target_cluster[0]) <= 1 and abs(start_cluster[1] - target_cluster[1]) <= 1:
+            # short queries are cheap to answer directly, and detours through transitions hurt them the most
+            return AStar(self.grid, start_pos, target_pos, self.diagonal, diagonal_cost=self.diagonal_cost).find_path()
+        abstract_path = self.find_abstract_path(start_pos, target_pos)
+        if abstract_path is None:
+            return None, (time.time() - start_time), math.inf
+
+        path = [start_pos]
+        total_cost = 0
+        for curr, nxt in zip(abstract_path, abstract_path[1:]):
+            if nxt in self.inter_edges.get(curr, {}):
+                # a single move across a cluster border
+                path.append(nxt)
+                total_cost += self.inter_edges[curr][nxt]
+                continue
+            segment, _, cost = AStar(self.grid, curr, nxt, self.diagonal, diagonal_cost=self.diagonal_cost).find_path()
+            path.extend(segment[1:])
+            total_cost += cost
+        return path, (time.time() - start_time), total_cost
@@ -0,0 +1,245 @@
+import heapq
+import itertools
+import math
+import time
+from array import array
+
+from alg import MOVES, octile_distance
+
+# the decimal places keys are rounded to; rounding noise in the costs is far below this, and real differences above
+KEY_DIGITS = 9
+
+
+class DStarLite:
+    """
+        DStarLite is an incremental planner that repairs its previous search when cells change or the start moves.
+
+        The search runs backwards from the target and keeps a g value and a one-step lookahead rhs value for every
+        cell between calls. After ``set_cell`` or ``move_start`` only the cells whose costs are affected by the
+        change are re-expanded, so small edits are cheap to replan regardless of the size of the grid.
+        Moving the target changes the root of the search, so ``move_target`` starts over.
+
+        The planner keeps its own copy of the grid's obstacles; edit cells through ``set_cell`` rather than
+        mutating the grid it was built from.
+
+        Attributes
+        ----------
+        start_pos : tuple
+            The current start position.
+        target_pos : tuple
+            The target position the search is rooted at.
+        diagonal : bool
+            Indicates if diagonal movement is allowed.
+        diagonal_cost : bool
+            Indicates if diagonal moves cost sqrt(2) instead of 1.
+        expanded_count : int
+            The number of cells expanded by the most recent call to find_path.
+
+        Methods
+        -------
+        set_cell(row, col, blocked)
+            Adds or removes an obstacle and marks the affected cells for repair.
+        move_start(pos)
+            Moves the start position.
+        move_target(pos)
+            Moves the target position, discarding the previous search.
+        find_path()
+            Repairs the search and returns the path from the start to the target.
+    """
+    def __init__(self, grid, start_pos, target_pos, diagonal=False, diagonal_cost=True):
+        self.height = len(grid)
+        self.width = len(grid[0])
+        self.blocked = bytearray(1 if cell else 0 for row in grid for cell in row)
+        self.start_pos = start_pos
+        self.target_pos = target_pos
+        self.diagonal = diagonal
+        self.diagonal_cost = diagonal_cost
+        self.moves = []
+        for move in (MOVES if diagonal else MOVES[:4]):
+            added_g_cost = 1
+            if diagonal and diagonal_cost and move[0] != 0 and move[1] != 0:
+                added_g_cost = math.sqrt(2)
+            self.moves.append((move[0], move[1], added_g_cost))
+        self.expanded_count = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Discards all search state and roots a fresh search at the target.
+
+        :return: None
+        """
+        size = self.height * self.width
+        self.g = array("d", [math.inf]) * size
+        self.rhs = array("d", [math.inf]) * size
+        # heap of (k1, k2, insertion order, index) entries; queued holds the live key of each queued cell
+        self.open_list = []
+        self.queued = {}
+        self.counter = itertools.count()
+        self.km = 0
+        target = self.index(self.target_pos)
+        self.rhs[target] = 0
+        self.push(target, (self.heuristic(self.target_pos), 0))
+
+    def index(self, position):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :return: The flat index of the cell.
+        """
+        return position[0] * self.width + position[1]
+
+    def heuristic(self, position):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :return: A consistent estimate of the cost between the cell and the current start position.
+        """
+        return octile_distance(position, self.start_pos, self.diagonal, self.diagonal_cost)
+
+    def neighbors(self, index):
+        """
+        :param index: The flat index of a cell.
+        :return: A list of (neighbor index, move cost) tuples for the free cells next to the cell.
+        """
+        row, col = divmod(index, self.width)
+        result = []
+        for d_row, d_col, added_g_cost in self.moves:
+            new_row, new_col = row + d_row, col + d_col
+            if 0 <= new_row < self.height and 0 <= new_col < self.width:
+                new = new_row * self.width + new_col
+                if not self.blocked[new]:
+                    result.append((new, added_g_cost))
+        return result
+
+    def calculate_key(self, index):
+        """
+        :param index: The flat index of a cell.
+        :return: The priority of the cell as a (k1, k2) tuple, rounded so that sums of sqrt(2) costs that are equal
+            but were added up in a different order compare as equal.
+        """
+        best = min(self.g[index], self.rhs[index])
+        return round(best + self.heuristic(divmod(index, self.width)) + self.km, KEY_DIGITS), round(best, KEY_DIGITS)
+
+    def push(self, index, key):
+        self.queued[index] = key
+        heapq.heappush(self.open_list, (key[0], key[1], next(self.counter), index))
+
+    def top_key(self):
+        """
+        :return: The smallest live key in the open list, dropping stale heap entries.
+        """
+        while self.open_list:
+            k1, k2, _, index = self.open_list[0]
+            if self.queued.get(index) == (k1, k2):
+                return k1, k2
+            heapq.heappop(self.open_list)
+        return math.inf, math.inf
+
+    def update_vertex(self, index):
+        """
+        Recomputes the rhs value of a cell and queues it if it is locally inconsistent.
+
+        :param index: The flat index of a cell.
+        :return: None
+        """
+        if index != self.index(self.target_pos):
+            best = math.inf
+            if not self.blocked[index]:
+                g = self.g
+                for neighbor, cost in self.neighbors(index):
+                    if cost + g[neighbor] < best:
+                        best = cost + g[neighbor]
+            self.rhs[index] = best
+        self.queued.pop(index, None)
+        if self.g[index] != self.rhs[index]:
+            self.push(index, self.calculate_key(index))
+
+    def compute_shortest_path(self):
+        """
+        Expands inconsistent cells until the start cell is consistent and no queued cell can improve it.
+
+        :return: None
+        """
+        start = self.index(self.start_pos)
+        g, rhs = self.g, self.rhs
+        while self.top_key() < self.calculate_key(start) or rhs[start] != g[start]:
+            k1, k2, _, index = heapq.heappop(self.open_list)
+            if self.queued.get(index) != (k1, k2):
+                continue
+            del self.queued[index]
+            self.expanded_count += 1
+            new_key = self.calculate_key(index)
+            if (k1, k2) < new_key:
+                self.push(index, new_key)
+            elif g[index] > rhs[index]:
+                g[index] = rhs[index]
+                for neighbor, _ in self.neighbors(index):
+                    self.update_vertex(neighbor)
+            else:
+                g[index] = math.inf
+                for neighbor, _ in self.neighbors(index):
+                    self.update_vertex(neighbor)
+                self.update_vertex(index)
+
+    def set_cell(self, row, col, blocked):
+        """
+        :param row: The row of the cell to change.
+        :param col: The column of the cell to change.
+        :param blocked: True to place an obstacle on the cell, False to clear it.
+        :return: None
+        """
+        index = row * self.width + col
+        if bool(self.blocked[index]) == bool(blocked):
+            return
+        self.blocked[index] = 1 if blocked else 0
+        self.update_vertex(index)
+        for d_row, d_col, _ in self.moves:
+            new_row, new_col = row + d_row, col + d_col
+            if 0 <= new_row < self.height and 0 <= new_col < self.width:
+                self.update_vertex(new_row * self.width + new_col)
+
+    def move_start(self, pos):
+        """
+        :param pos: The new start position.
+        :return: None
+        """
+        last_start = self.start_pos
+        self.start_pos = pos
+        # keys queued for the old start stay valid lower bounds by raising km instead of re-keying the queue
+        self.km += self.heuristic(last_start)
+
+    def move_target(self, pos):
+        """
+        :param pos: The new target position.
+        :return: None
+        """
+        self.target_pos = pos
+        self.reset()
+
+    def find_path(self):
+        """
+        Repairs the search after any changes and follows the cheapest neighbors from the start to the target.
+
+        :return: A tuple containing the list of positions representing the path from the start position to the target position,
+            the time taken to find the path and the path cost.
+        """
+        start_time = time.time()
+        self.expanded_count = 0
+        start = self.index(self.start_pos)
+        if self.blocked[start]:
+            return None, (time.time() - start_time), math.inf
+        self.compute_shortest_path()
+
+        g = self.g
+        if g[start] == math.inf:
+            return None, (time.time() - start_time), math.inf
+
+        target = self.index(self.target_pos)
+        path = [self.start_pos]
+        curr = start
+        # the cost is summed along the path followed, so it always matches the path returned
+        cost = 0
+        while curr != target:
+            curr, added_g_cost = min(self.neighbors(curr), key=lambda neighbor: neighbor[1] + g[neighbor[0]])
+            cost += added_g_cost
+            path.append(divmod(curr, self.width))
+        return path, (time.time() - start_time), cost
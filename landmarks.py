@@ -0,0 +1,246 @@
+import hashlib
+import math
+import os
+import struct
+import time
+from array import array
+
+from alg import init_worker, octile_distance, worker_state
+from flowfield import FlowField
+
+# header of the landmark file format: magic, table typecode, diagonal, diagonal_cost, height, width, landmark
+# count and the grid hash
+LANDMARK_HEADER = struct.Struct("<4scBBIII20s")
+LANDMARK_MAGIC = b"ALT1"
+
+
+def grid_hash(grid):
+    """
+    :param grid: 2D list representing the grid, or any grid with the same interface.
+    :return: A SHA-1 digest of the grid's size and cells.
+    """
+    digest = hashlib.sha1(struct.pack("<II", len(grid), len(grid[0])))
+    for row in grid:
+        digest.update(bytes(1 if cell else 0 for cell in row))
+    return digest.digest()
+
+
+def select_landmarks(grid, count):
+    """
+    Picks landmarks spread around the edge of the map: count directions are spaced evenly around the center of
+    the map, and for each the free cell lying farthest out along it (within its share of the angles) is picked, so
+    landmarks land on the corners and the middles of the edges rather than bunching up.
+
+    :param grid: 2D list representing the grid.
+    :param count: The number of landmarks to pick.
+    :return: A list of up to count landmark positions (fewer if some directions hold no free cell).
+    """
+    height, width = len(grid), len(grid[0])
+    center_row, center_col = (height - 1) / 2, (width - 1) / 2
+    directions = [(math.sin(2 * math.pi * i / count), math.cos(2 * math.pi * i / count)) for i in range(count)]
+    best = [(-math.inf, None)] * count
+    for row in range(height):
+        cells = grid[row]
+        for col in range(width):
+            if cells[col] != 0:
+                continue
+            d_row, d_col = row - center_row, col - center_col
+            sector = round(math.atan2(d_row, d_col) / (2 * math.pi) * count) % count
+            direction_row, direction_col = directions[sector]
+            # the distance along the direction, with ties going to the cell closest to the direction's line
+            score = d_row * direction_row + d_col * direction_col - 1e-3 * abs(d_row * direction_col - d_col * direction_row)
+            if score > best[sector][0]:
+                best[sector] = (score, (row, col))
+    return [position for _, position in best if position is not None]
+
+
+def _landmark_distances(position):
+    state = worker_state
+    return FlowField(state["grid"], position, state["diagonal"], diagonal_cost=state["diagonal_cost"]).distances
+
+
+class Landmarks:
+    """
+        Landmarks holds the ALT (A*, landmarks and triangle inequality) heuristic for one grid and movement mode.
+
+        The distance from every cell to each of a few landmarks is computed up front with FlowField. Moves are
+        symmetric, so for any landmark L the triangle inequality gives |d(L, target) - d(L, cell)| as a lower bound
+        on the cost from the cell to the target. The heuristic is the largest of these bounds and the plain distance
+        of the mode (Manhattan, Chebyshev or octile), which makes it consistent and usually far tighter on maps
+        with many obstacles. Cells in a different connected component from the target get an infinite estimate.
+
+        Tables are stored as 32-bit floats when every move costs 1, since the distances are whole numbers, and as
+        64-bit floats otherwise. ``save`` writes them to disk along with a hash of the grid, so ``load`` (or
+        ``load_or_build``) can reuse them at startup and refuse tables built for another grid.
+
+        Attributes
+        ----------
+        landmarks : list
+            The landmark positions.
+        tables : list
+            One array per landmark of the distance from every cell, indexed by row * width + col (inf when unreachable).
+        digest : bytes
+            The hash of the grid the tables were built for.
+        build_time : float
+            The time taken to build (or load) the tables.
+
+        Methods
+        -------
+        build(grid, count=8, diagonal=False, diagonal_cost=True, workers=None)
+            Picks landmarks and builds their tables, one landmark per worker process.
+        heuristic(position, target_position)
+            Returns the ALT estimate of the cost between two cells; pass it as AStar's heuristic.
+        save(path)
+            Writes the tables to a file.
+        load(path, grid=None)
+            Reads tables from a file, checking them against the grid if one is given.
+        load_or_build(grid, directory, count=8, diagonal=False, diagonal_cost=True, workers=None)
+            Loads the tables for the grid from a directory, building and saving them if they are missing.
+    """
+    def __init__(self, landmarks, tables, height, width, diagonal, diagonal_cost, digest):
+        self.landmarks = landmarks
+        self.tables = tables
+        self.height = height
+        self.width = width
+        self.diagonal = diagonal
+        self.diagonal_cost = diagonal_cost
+        self.digest = digest
+        self.build_time = 0
+        self.target_index = None
+        self.target_distances = []
+
+    @staticmethod
+    def typecode(diagonal, diagonal_cost):
+        """
+        :param diagonal: Indicates if diagonal movement is allowed.
+        :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+        :return: The array typecode of the tables: "f" when every distance is a whole number, otherwise "d".
+        """
+        return "d" if diagonal and diagonal_cost else "f"
+
+    @classmethod
+    def build(cls, grid, count=8, diagonal=False, diagonal_cost=True, workers=None):
+        """
+        :param grid: 2D list representing the grid.
+        :param count: The number of landmarks.
+        :param diagonal: Indicates if diagonal movement is allowed.
+        :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+        :param workers: The number of worker processes (default is one per landmark, up to the number of CPUs);
+            1 builds the tables in this process.
+        :return: A Landmarks instance for the grid.
+        """
+        start_time = time.time()
+        landmarks = select_landmarks(grid, count)
+        workers = min(workers or os.cpu_count() or 1, max(1, len(landmarks)))
+        state = {"grid": grid, "diagonal": diagonal, "diagonal_cost": diagonal_cost}
+        if workers == 1:
+            init_worker(state)
+            distances = [_landmark_distances(position) for position in landmarks]
+        else:
+            # imported here, as it takes longer to import than the rest of the module
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(state,)) as executor:
+                distances = list(executor.map(_landmark_distances, landmarks))
+        typecode = cls.typecode(diagonal, diagonal_cost)
+        tables = [table if typecode == "d" else array(typecode, table) for table in distances]
+        result = cls(landmarks, tables, len(grid), len(grid[0]), diagonal, diagonal_cost, grid_hash(grid))
+        result.build_time = time.time() - start_time
+        return result
+
+    def distance(self, position, target_position):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :param target_position: A tuple containing the row and column of another cell.
+        :return: The consistent distance between the cells for the movement mode, ignoring obstacles.
+        """
+        return octile_distance(position, target_position, self.diagonal, self.diagonal_cost)
+
+    def heuristic(self, position, target_position):
+        """
+        :param position: A tuple containing the row and column of a cell.
+        :param target_position: A tuple containing the row and column of the target.
+        :return: A consistent lower bound on the cost from the cell to the target, or inf if the target cannot be reached.
+        """
+        target = target_position[0] * self.width + target_position[1]
+        if target != self.target_index:
+            # the target rarely changes during a search, so its distances are looked up once
+            self.target_index = target
+            self.target_distances = [table[target] for table in self.tables]
+        index = position[0] * self.width + position[1]
+        best = self.distance(position, target_position)
+        for table, target_distance in zip(self.tables, self.target_distances):
+            distance = table[index]
+            if distance == math.inf or target_distance == math.inf:
+                if distance != target_distance:
+                    return math.inf
+                continue
+            bound = target_distance - distance if target_distance > distance else distance - target_distance
+            if bound > best:
+                best = bound
+        return best
+
+    def save(self, path):
+        """
+        :param path: The file to write.
+        :return: None
+        """
+        typecode = self.typecode(self.diagonal, self.diagonal_cost)
+        # written next to the target and moved into place, so readers never see a partial file
+        partial_path = path + ".partial"
+        with open(partial_path, "wb") as file:
+            file.write(LANDMARK_HEADER.pack(LANDMARK_MAGIC, typecode.encode(), self.diagonal, self.diagonal_cost,
+                                            self.height, self.width, len(self.landmarks), self.digest))
+            array("I", [coordinate for position in self.landmarks for coordinate in position]).tofile(file)
+            for table in self.tables:
+                table.tofile(file)
+        os.replace(partial_path, path)
+
+    @classmethod
+    def load(cls, path, grid=None):
+        """
+        :param path: A file written by save.
+        :param grid: The grid the tables are meant for; if given, tables built for any other grid are rejected.
+        :return: A Landmarks instance.
+        """
+        start_time = time.time()
+        with open(path, "rb") as file:
+            magic, typecode, diagonal, diagonal_cost, height, width, count, digest = \
+                LANDMARK_HEADER.unpack(file.read(LANDMARK_HEADER.size))
+            if magic != LANDMARK_MAGIC:
+                raise ValueError(f"{path} is not a landmark file")
+            if grid is not None and digest != grid_hash(grid):
+                raise ValueError(f"{path} was built for a different grid")
+            coordinates = array("I")
+            coordinates.fromfile(file, 2 * count)
+            tables = []
+            for _ in range(count):
+                table = array(typecode.decode())
+                table.fromfile(file, height * width)
+                tables.append(table)
+        landmarks = [(coordinates[i], coordinates[i + 1]) for i in range(0, len(coordinates), 2)]
+        result = cls(landmarks, tables, height, width, bool(diagonal), bool(diagonal_cost), digest)
+        result.build_time = time.time() - start_time
+        return result
+
+    @classmethod
+    def load_or_build(cls, grid, directory, count=8, diagonal=False, diagonal_cost=True, workers=None):
+        """
+        :param grid: 2D list representing the grid.
+        :param directory: The directory the tables are kept in, one file per grid, mode and landmark count.
+        :param count: The number of landmarks.
+        :param diagonal: Indicates if diagonal movement is allowed.
+        :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+        :param workers: The number of worker processes used if the tables have to be built.
+        :return: A Landmarks instance for the grid.
+        """
+        digest = grid_hash(grid)
+        name = f"{digest.hex()}-{int(diagonal)}{int(diagonal_cost)}-{count}.alt"
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            landmarks = cls.load(path)
+            if landmarks.digest == digest:
+                return landmarks
+        landmarks = cls.build(grid, count, diagonal, diagonal_cost, workers)
+        os.makedirs(directory, exist_ok=True)
+        landmarks.save(path)
+        return landmarks
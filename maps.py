@@ -0,0 +1,427 @@
+import heapq
+import mmap
+import os
+import random
+import struct
+
+
+def empty_grid(rows, cols, seed=0):
+    """
+    :param rows: The number of rows in the grid.
+    :param cols: The number of columns in the grid.
+    :param seed: Unused; accepted so every generator can be called the same way.
+    :return: A 2D list with no obstacles.
+    """
+    return [[0] * cols for _ in range(rows)]
+
+
+def random_grid(rows, cols, density=0.2, seed=0):
+    """
+    :param rows: The number of rows in the grid.
+    :param cols: The number of columns in the grid.
+    :param density: The fraction of cells that are obstacles.
+    :param seed: The seed used to place the obstacles.
+    :return: A 2D list where 0 denotes free space and 1 denotes an obstacle. The corners are free and joined by a
+        4-connected path, carved through as few obstacles as possible if the placement walled them off, so corner to
+        corner benchmarks always time a search that finds a path.
+    """
+    rng = random.Random(seed)
+    grid = [[1 if rng.random() < density else 0 for _ in range(cols)] for _ in range(rows)]
+    grid[0][0] = 0
+    grid[rows - 1][cols - 1] = 0
+    carve_path(grid, (0, 0), (rows - 1, cols - 1))
+    return grid
+
+
+def carve_path(grid, start_pos, target_pos):
+    """
+    Clears the fewest obstacles needed to join two free cells with a 4-connected path, which joins them in every
+    movement mode. Grids where the cells are already connected are left as they are.
+
+    :param grid: 2D list where 0 denotes free space and 1 denotes an obstacle; it is modified in place.
+    :param start_pos: A tuple containing the row and column of a free cell.
+    :param target_pos: A tuple containing the row and column of another free cell.
+    :return: The number of obstacles cleared.
+    """
+    rows, cols = len(grid), len(grid[0])
+    target_row, target_col = target_pos
+    # a best-first search by obstacles crossed, ties going to the cell closest to the target, which heads straight
+    # for the target when the cells are already connected
+    crossed = {start_pos: 0}
+    parents = {start_pos: None}
+    open_list = [(0, 0, start_pos)]
+    while open_list:
+        cost, _, position = heapq.heappop(open_list)
+        if position == target_pos:
+            break
+        if cost > crossed[position]:
+            continue
+        row, col = position
+        for new_row, new_col in ((row, col + 1), (row + 1, col), (row, col - 1), (row - 1, col)):
+            if 0 <= new_row < rows and 0 <= new_col < cols:
+                new_cost = cost + grid[new_row][new_col]
+                if new_cost < crossed.get((new_row, new_col), new_cost + 1):
+                    crossed[(new_row, new_col)] = new_cost
+                    parents[(new_row, new_col)] = position
+                    distance = abs(new_row - target_row) + abs(new_col - target_col)
+                    heapq.heappush(open_list, (new_cost, distance, (new_row, new_col)))
+    position = target_pos
+    while position is not None:
+        grid[position[0]][position[1]] = 0
+        position = parents[position]
+    return crossed[target_pos]
+
+
+def maze_grid(rows, cols, seed=0):
+    """
+    :param rows: The number of rows in the grid.
+    :param cols: The number of columns in the grid.
+    :param seed: The seed used to carve the maze.
+    :return: A 2D list holding a maze with one-cell-wide corridors, carved by a randomized depth-first search.
+    """
+    rng = random.Random(seed)
+    grid = [[1] * cols for _ in range(rows)]
+    grid[0][0] = 0
+    stack = [(0, 0)]
+    while stack:
+        row, col = stack[-1]
+        options = [(row + d_row, col + d_col, d_row // 2, d_col // 2)
+                   for d_row, d_col in ((0, 2), (2, 0), (0, -2), (-2, 0))
+                   if 0 <= row + d_row < rows and 0 <= col + d_col < cols and grid[row + d_row][col + d_col]]
+        if not options:
+            stack.pop()
+            continue
+        new_row, new_col, half_row, half_col = rng.choice(options)
+        grid[row + half_row][col + half_col] = 0
+        grid[new_row][new_col] = 0
+        stack.append((new_row, new_col))
+    # make sure the far corner is connected when the size is even
+    grid[rows - 1][cols - 1] = 0
+    if rows > 1:
+        grid[rows - 2][cols - 1] = 0
+    return grid
+
+
+def rooms_grid(rows, cols, seed=0, room_size=12, door_width=2):
+    """
+    :param rows: The number of rows in the grid.
+    :param cols: The number of columns in the grid.
+    :param seed: The seed used to place the doors.
+    :param room_size: The distance between walls, including the wall itself.
+    :param door_width: The widest door cut into a wall.
+    :return: A 2D list of square rooms separated by one-cell walls, with a door in every wall between two
+        neighboring rooms, so every room is reachable and the corners are kept free.
+    """
+    rng = random.Random(seed)
+    grid = [[0] * cols for _ in range(rows)]
+    wall_rows = list(range(room_size, rows - 1, room_size))
+    wall_cols = list(range(room_size, cols - 1, room_size))
+    for row in wall_rows:
+        grid[row] = [1] * cols
+    for col in wall_cols:
+        for row in range(rows):
+            grid[row][col] = 1
+
+    # the spans of free cells between consecutive walls
+    row_spans = [(low + 1 if low else 0, high) for low, high in zip([0] + wall_rows, wall_rows + [rows])]
+    col_spans = [(low + 1 if low else 0, high) for low, high in zip([0] + wall_cols, wall_cols + [cols])]
+
+    def door(low, high):
+        width = rng.randint(1, min(door_width, high - low))
+        first = rng.randrange(low, high - width + 1)
+        return range(first, first + width)
+
+    for row in wall_rows:
+        for low, high in col_spans:
+            for col in door(low, high):
+                grid[row][col] = 0
+    for col in wall_cols:
+        for low, high in row_spans:
+            for row in door(low, high):
+                grid[row][col] = 0
+    return grid
+
+
+def random_pairs(grid, count, seed=0):
+    """
+    :param grid: 2D list representing the grid.
+    :param count: The number of (start, target) pairs to generate.
+    :param seed: The seed used to pick the cells.
+    :return: A list of (start_pos, target_pos) tuples on free cells.
+    """
+    rng = random.Random(seed)
+    free = [(row, col) for row in range(len(grid)) for col in range(len(grid[0])) if grid[row][col] == 0]
+    return [(rng.choice(free), rng.choice(free)) for _ in range(count)]
+
+
+# characters of the MovingAI .map format that ground units can pass through
+PASSABLE = frozenset(".GS")
+
+# header of the binary grid format: magic, bits per cell, height and width
+GRID_HEADER = struct.Struct("<4sBII")
+GRID_MAGIC = b"GRID"
+
+
+def read_map_header(file):
+    """
+    :param file: An open MovingAI .map file, positioned at its start.
+    :return: A (height, width) tuple, leaving the file positioned at the first row of the map.
+    """
+    height = width = None
+    for line in file:
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == "height":
+            height = int(fields[1])
+        elif fields[0] == "width":
+            width = int(fields[1])
+        elif fields[0] == "map":
+            break
+    if height is None or width is None:
+        raise ValueError("not a MovingAI map: missing height or width")
+    return height, width
+
+
+def map_rows(file, height, width):
+    """
+    :param file: An open MovingAI .map file, positioned at the first row of the map.
+    :param height: The number of rows in the map.
+    :param width: The number of columns in the map.
+    :return: A generator of rows, each a list where 0 denotes a passable cell and 1 an obstacle.
+    """
+    for row in range(height):
+        line = file.readline().rstrip("\r\n")
+        if len(line) < width:
+            raise ValueError(f"row {row} of the map is shorter than its width {width}")
+        yield [0 if cell in PASSABLE else 1 for cell in line[:width]]
+
+
+def load_map(path):
+    """
+    :param path: The path of a MovingAI .map file.
+    :return: A 2D list where 0 denotes a passable cell ('.', 'G' or 'S') and 1 an obstacle.
+    """
+    with open(path) as file:
+        height, width = read_map_header(file)
+        return list(map_rows(file, height, width))
+
+
+def load_scenarios(path):
+    """
+    :param path: The path of a MovingAI .scen file.
+    :return: A list of dicts with the bucket, map file, start and target (as (row, col) tuples) and optimal length
+        of each scenario. The optimal lengths assume diagonal moves cost sqrt(2) and never cut corners.
+    """
+    scenarios = []
+    with open(path) as file:
+        for line in file:
+            fields = line.split()
+            if len(fields) < 9 or fields[0] == "version":
+                continue
+            bucket, map_file = int(fields[0]), fields[1]
+            start_col, start_row, target_col, target_row = (int(field) for field in fields[4:8])
+            scenarios.append({
+                "bucket": bucket,
+                "map": map_file,
+                "start": (start_row, start_col),
+                "target": (target_row, target_col),
+                "optimal": float(fields[8]),
+            })
+    return scenarios
+
+
+def row_bytes(row, bits):
+    """
+    :param row: A row of 0 and 1 cells.
+    :param bits: The bits per cell, 8 or 1.
+    :return: The row encoded for the binary grid format.
+    """
+    if bits == 8:
+        return bytes(row)
+    packed = bytearray((len(row) + 7) // 8)
+    for col, cell in enumerate(row):
+        if cell:
+            packed[col >> 3] |= 1 << (col & 7)
+    return bytes(packed)
+
+
+def write_grid(rows, height, width, path, bits=8):
+    """
+    Writes rows to the binary grid format: a GRID_HEADER followed by the rows, one byte per cell, or one bit per
+    cell with each row padded to a whole byte.
+
+    :param rows: An iterable of rows of 0 and 1 cells, which is consumed one row at a time.
+    :param height: The number of rows.
+    :param width: The number of columns.
+    :param path: The file to write.
+    :param bits: The bits per cell, 8 or 1.
+    :return: None
+    """
+    if bits not in (1, 8):
+        raise ValueError("bits must be 1 or 8")
+    with open(path, "wb") as file:
+        file.write(GRID_HEADER.pack(GRID_MAGIC, bits, height, width))
+        for row in rows:
+            file.write(row_bytes(row, bits))
+
+
+def save_grid(grid, path, bits=8):
+    """
+    :param grid: 2D list representing the grid.
+    :param path: The file to write.
+    :param bits: The bits per cell, 8 or 1.
+    :return: None
+    """
+    write_grid(grid, len(grid), len(grid[0]), path, bits)
+
+
+def convert_map(map_path, grid_path, bits=8):
+    """
+    Converts a MovingAI .map file to the binary grid format one row at a time, so the map is never held in memory.
+
+    :param map_path: The path of a MovingAI .map file.
+    :param grid_path: The file to write.
+    :param bits: The bits per cell, 8 or 1.
+    :return: None
+    """
+    with open(map_path) as file:
+        height, width = read_map_header(file)
+        write_grid(map_rows(file, height, width), height, width, grid_path, bits)
+
+
+class PackedRow:
+    """
+        PackedRow is a view of one row of a one-bit-per-cell grid, indexed like a list of 0 and 1 cells.
+    """
+    __slots__ = ("buffer", "offset", "width")
+
+    def __init__(self, buffer, offset, width):
+        self.buffer = buffer
+        self.offset = offset
+        self.width = width
+
+    def __len__(self):
+        return self.width
+
+    def __getitem__(self, col):
+        if col < 0:
+            col += self.width
+        if not 0 <= col < self.width:
+            raise IndexError("column out of range")
+        return (self.buffer[self.offset + (col >> 3)] >> (col & 7)) & 1
+
+    def __setitem__(self, col, value):
+        if not 0 <= col < self.width:
+            raise IndexError("column out of range")
+        index = self.offset + (col >> 3)
+        if value:
+            self.buffer[index] |= 1 << (col & 7)
+        else:
+            self.buffer[index] &= ~(1 << (col & 7)) & 0xFF
+
+    def __iter__(self):
+        for col in range(self.width):
+            yield self[col]
+
+
+class MappedGrid:
+    """
+        MappedGrid is a memory-mapped grid in the binary grid format that can be passed anywhere a 2D list is
+        expected (``grid[row][col]`` and ``len``).
+
+        Opening a grid only maps the file, so even very large maps open instantly and pages are read in as the
+        search touches them. One-byte grids are exposed as ``memoryview`` rows straight over the mapping; one-bit
+        grids through PackedRow views. Pickling a MappedGrid pickles its path, so worker processes (such as the
+        pool of AStar.find_paths) map the same file and share its pages read-only instead of receiving a copy.
+
+        Attributes
+        ----------
+        path : str
+            The grid file.
+        bits : int
+            The bits per cell, 8 or 1.
+        height : int
+            The number of rows.
+        width : int
+            The number of columns.
+        writable : bool
+            Indicates if cells can be assigned, which writes them through to the file.
+
+        Methods
+        -------
+        close()
+            Releases the mapping and the file.
+    """
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        self.file = open(path, "r+b" if writable else "rb")
+        self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, self.bits, self.height, self.width = GRID_HEADER.unpack_from(self.mapping)
+        if magic != GRID_MAGIC:
+            raise ValueError(f"{path} is not a grid file")
+        stride = self.width if self.bits == 8 else (self.width + 7) // 8
+        if len(self.mapping) < GRID_HEADER.size + stride * self.height:
+            raise ValueError(f"{path} is truncated")
+
+        self.buffer = memoryview(self.mapping)
+        offsets = range(GRID_HEADER.size, GRID_HEADER.size + stride * self.height, stride)
+        if self.bits == 8:
+            self.rows = [self.buffer[offset:offset + self.width] for offset in offsets]
+        else:
+            self.rows = [PackedRow(self.buffer, offset, self.width) for offset in offsets]
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, row):
+        return self.rows[row]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __reduce__(self):
+        return MappedGrid, (self.path, self.writable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """
+        :return: None
+        """
+        for row in self.rows:
+            if isinstance(row, memoryview):
+                row.release()
+        self.rows = []
+        self.buffer.release()
+        self.mapping.close()
+        self.file.close()
+
+
+def open_grid(path, writable=False):
+    """
+    :param path: A file in the binary grid format, or a MovingAI .map file, which is converted next to it (as
+        path + ".grid") the first time it is opened.
+    :param writable: Indicates if cells can be assigned, which writes them through to the file.
+    :return: A MappedGrid over the file.
+    """
+    if path.endswith(".map"):
+        grid_path = path + ".grid"
+        if not os.path.exists(grid_path) or os.path.getmtime(grid_path) < os.path.getmtime(path):
+            convert_map(path, grid_path)
+        path = grid_path
+    return MappedGrid(path, writable)
+
+
+# map generators selectable by name, each called as generator(rows, cols, seed=seed)
+GENERATORS = {
+    "empty": empty_grid,
+    "random": random_grid,
+    "maze": maze_grid,
+    "rooms": rooms_grid,
+}
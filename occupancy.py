@@ -0,0 +1,180 @@
+import math
+
+from alg import MOVES
+
+# mask -> the indices into MOVES of its set bits, so the moves open from a cell are a single lookup
+MASK_MOVES = [tuple(move for move in range(len(MOVES)) if mask >> move & 1) for mask in range(1 << len(MOVES))]
+
+# bytes.translate tables mapping a cell to 1 if it is an obstacle, or to 1 if it is free
+BLOCKED_TABLE = bytes([0] + [1] * 255)
+FREE_TABLE = bytes([1] + [0] * 255)
+
+
+class OccupancyGrid:
+    """
+        OccupancyGrid packs the obstacles of a grid one bit per cell and keeps, for every cell, a bitmask of the
+        moves that lead from it to a free cell within the grid.
+
+        Bit k of a cell's mask is set when MOVES[k] is open, for the four straight moves only unless diagonal
+        movement is allowed, so a search finds the successors of a cell with one lookup into ``successor_table``
+        instead of a bounds check and two list lookups per move. Obstacle cells get an empty mask. Changing cells
+        updates their bits and the masks of the cells around them; ``set_cells`` applies a batch of changes and
+        recomputes each affected mask once.
+
+        Attributes
+        ----------
+        height : int
+            The number of rows.
+        width : int
+            The number of columns.
+        diagonal : bool
+            Indicates if the masks include the diagonal moves.
+        bits : bytearray
+            One bit per cell, indexed by row * width + col, set for obstacles.
+        masks : bytearray
+            The open moves of each cell, indexed by row * width + col.
+
+        Methods
+        -------
+        is_blocked(row, col)
+            Returns True if a cell is an obstacle.
+        set_cell(row, col, blocked)
+            Places or clears an obstacle.
+        set_cells(changes)
+            Places or clears several obstacles at once.
+        successor_table(diagonal_cost=True)
+            Returns the (d_row, d_col, index delta, cost) steps of every mask.
+        copy()
+            Returns an independent copy.
+    """
+    def __init__(self, grid, diagonal=False):
+        self.height = len(grid)
+        self.width = len(grid[0])
+        self.diagonal = diagonal
+        self.moves = MOVES if diagonal else MOVES[:4]
+        self.successor_tables = {}
+        # one byte per cell, 1 for obstacles
+        cells = b"".join(bytes(row) for row in grid).translate(BLOCKED_TABLE)
+        self.bits = self.pack(cells)
+        self.masks = self.build_masks(cells)
+
+    @staticmethod
+    def pack(cells):
+        """
+        Packs one byte per cell into one bit per cell. Read as one integer, cell i is bit 8 * i; three rounds of
+        shifting and masking gather every eight bytes into the low byte of their 64-bit word, so the whole grid is
+        packed by a handful of integer operations rather than a loop over the cells.
+
+        :param cells: The cells, one byte each, 0 or 1.
+        :return: A bytearray holding cell i at bit i % 8 of byte i // 8.
+        """
+        words = (len(cells) + 7) // 8
+        packed = int.from_bytes(cells, "little")
+        for shift, keep in ((7, b"\x03\x00"), (14, b"\x0f\x00\x00\x00"), (28, b"\xff" + bytes(7))):
+            packed |= packed >> shift
+            packed &= int.from_bytes(keep * (words * 8 // len(keep)), "little")
+        return bytearray(packed.to_bytes(words * 8, "little")[::8])
+
+    def build_masks(self, cells):
+        """
+        Computes the neighbor mask of every cell at once: read as one integer with a byte per cell, the free cells
+        shifted by the index delta of a move, intersected with the free cells and with the cells from which the move
+        stays within the grid, are the cells from which that move is open.
+
+        :param cells: The cells, one byte each, 0 or 1.
+        :return: A bytearray holding the mask of each cell.
+        """
+        height, width = self.height, self.width
+        free = int.from_bytes(cells.translate(FREE_TABLE), "little")
+        masks = 0
+        for move, (d_row, d_col) in enumerate(self.moves):
+            row_inside = bytes(1 if 0 <= col + d_col < width else 0 for col in range(width))
+            first_row, last_row = max(0, -d_row), min(height, height - d_row)
+            inside = int.from_bytes(bytes(width * first_row) + row_inside * (last_row - first_row) +
+                                    bytes(width * (height - last_row)), "little")
+            delta = d_row * width + d_col
+            shifted = free >> (8 * delta) if delta > 0 else free << (-8 * delta)
+            # every byte of the layer is 0 or 1, so shifting it by the move's bit stays within the byte
+            masks |= (shifted & free & inside) << move
+        return bytearray(masks.to_bytes(height * width, "little"))
+
+    def is_blocked(self, row, col):
+        """
+        :param row: The row of the cell.
+        :param col: The column of the cell.
+        :return: True if the cell is an obstacle.
+        """
+        index = row * self.width + col
+        return self.bits[index >> 3] >> (index & 7) & 1 == 1
+
+    def neighbor_mask(self, index):
+        """
+        :param index: The flat index of a cell.
+        :return: The bitmask of the moves from the cell to free cells within the grid (0 for an obstacle).
+        """
+        bits = self.bits
+        if bits[index >> 3] >> (index & 7) & 1:
+            return 0
+        row, col = divmod(index, self.width)
+        mask = 0
+        for move, (d_row, d_col) in enumerate(self.moves):
+            new_row, new_col = row + d_row, col + d_col
+            if 0 <= new_row < self.height and 0 <= new_col < self.width:
+                new = new_row * self.width + new_col
+                if not bits[new >> 3] >> (new & 7) & 1:
+                    mask |= 1 << move
+        return mask
+
+    def set_cell(self, row, col, blocked):
+        """
+        :param row: The row of the cell.
+        :param col: The column of the cell.
+        :param blocked: True to place an obstacle on the cell, False to clear it.
+        :return: None
+        """
+        self.set_cells([(row, col, blocked)])
+
+    def set_cells(self, changes):
+        """
+        :param changes: An iterable of (row, col, blocked) tuples.
+        :return: None
+        """
+        affected = set()
+        for row, col, blocked in changes:
+            index = row * self.width + col
+            if blocked:
+                self.bits[index >> 3] |= 1 << (index & 7)
+            else:
+                self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+            # the cell's own mask, and the masks of the cells with a move onto it
+            affected.add(index)
+            for d_row, d_col in self.moves:
+                new_row, new_col = row - d_row, col - d_col
+                if 0 <= new_row < self.height and 0 <= new_col < self.width:
+                    affected.add(new_row * self.width + new_col)
+        for index in affected:
+            self.masks[index] = self.neighbor_mask(index)
+
+    def successor_table(self, diagonal_cost=True):
+        """
+        :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+        :return: A list giving, for every mask, the (d_row, d_col, index delta, cost) step of each of its open moves.
+        """
+        table = self.successor_tables.get(diagonal_cost)
+        if table is None:
+            steps = [(d_row, d_col, d_row * self.width + d_col,
+                      math.sqrt(2) if diagonal_cost and d_row != 0 and d_col != 0 else 1) for d_row, d_col in MOVES]
+            table = self.successor_tables[diagonal_cost] = [tuple(steps[move] for move in moves)
+                                                            for moves in MASK_MOVES]
+        return table
+
+    def copy(self):
+        """
+        :return: An OccupancyGrid with the same cells that can be changed independently.
+        """
+        other = OccupancyGrid.__new__(OccupancyGrid)
+        other.height, other.width, other.diagonal, other.moves = self.height, self.width, self.diagonal, self.moves
+        other.bits = bytearray(self.bits)
+        other.masks = bytearray(self.masks)
+        other.successor_tables = self.successor_tables
+        return other
@@ -0,0 +1,293 @@
+import importlib
+
+# nothing here imports pygame, and solver modules are only imported when a solver is created, so batch jobs and
+# services that only answer queries start quickly
+
+# solver name -> (module, class, constructor options); every class takes (grid, start_pos, target_pos, diagonal,
+# diagonal_cost=...) and has a find_path() returning (path, time, cost), where a failed search returns
+# (None, time, inf)
+SOLVERS = {
+    "astar": ("alg", "AStar", {}),
+    "compact": ("alg", "CompactAStar", {}),
+    "jps": ("alg", "AStar", {"jump_point": True}),
+    "bidirectional": ("alg", "BidirectionalAStar", {}),
+    "weighted": ("alg", "AStar", {"weight": 1.5}),
+    "anytime": ("alg", "AnytimeAStar", {}),
+    "idastar": ("alg", "IDAStar", {}),
+}
+
+
+def get_solver(name):
+    """
+    :param name: A key of SOLVERS.
+    :return: A (class, constructor options) tuple, importing the class's module on first use.
+    """
+    if name not in SOLVERS:
+        raise ValueError(f"unknown solver {name!r}; choose from {', '.join(sorted(SOLVERS))}")
+    module, class_name, options = SOLVERS[name]
+    return getattr(importlib.import_module(module), class_name), dict(options)
+
+
+def create_solver(name, grid, start_pos, target_pos, diagonal=False, diagonal_cost=True, **options):
+    """
+    :param name: A key of SOLVERS.
+    :param grid: 2D list representing the grid, or a MappedGrid.
+    :param start_pos: The start position.
+    :param target_pos: The target position.
+    :param diagonal: Indicates if diagonal movement is allowed.
+    :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+    :param options: Constructor options overriding the registry's, such as weight or heuristic.
+    :return: An instance of the solver, ready for find_path.
+    """
+    solver, defaults = get_solver(name)
+    defaults.update(options)
+    return solver(grid, start_pos, target_pos, diagonal, diagonal_cost=diagonal_cost, **defaults)
+
+
+class GridModel:
+    """
+        GridModel holds a grid and a version number that changes with every edit, with no display attached.
+
+        Attributes
+        ----------
+        grid : list
+            2D list where 0 denotes free space and 1 denotes an obstacle (or a MappedGrid, for loaded binary grids).
+        height : int
+            The number of rows.
+        width : int
+            The number of columns.
+        version : int
+            Incremented by every edit; results computed for an older version are stale.
+        component_indexes : dict
+            The ComponentIndex of the grid for 4-connected (False) and 8-connected (True) movement, built on first
+            use and kept up to date by toggle and set_cell.
+        occupancy_grids : dict
+            The OccupancyGrid of the grid for 4-connected (False) and 8-connected (True) movement, built on first
+            use and kept up to date the same way.
+
+        Methods
+        -------
+        load(path)
+            Loads a MovingAI .map file or a binary grid file.
+        toggle(row, col)
+            Toggles an obstacle and returns the new state of the cell.
+        set_cell(row, col, blocked)
+            Places or clears an obstacle.
+        set_cells(changes)
+            Places or clears several obstacles at once.
+        changed()
+            Bumps the version after the grid was mutated directly.
+        obstacles()
+            Returns the positions of every obstacle.
+        components(diagonal=False)
+            Returns the ComponentIndex of the grid for a movement mode.
+        occupancy(diagonal=False)
+            Returns the OccupancyGrid of the grid for a movement mode.
+        connected(start_pos, target_pos, diagonal=False)
+            Returns True if a path exists between two cells.
+        create_solver(start_pos, target_pos, solver="astar", diagonal=False, diagonal_cost=True, **options)
+            Creates a registered solver on the grid that rejects queries between different components.
+        solve(start_pos, target_pos, solver="astar", diagonal=False, diagonal_cost=True, **options)
+            Runs a registered solver on the grid and returns its find_path result.
+    """
+    def __init__(self, height, width, grid=None):
+        self.height = height
+        self.width = width
+        self.grid = grid if grid is not None else [[0] * width for _ in range(height)]
+        self.version = 0
+        self.component_indexes = {}
+        self.occupancy_grids = {}
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: A MovingAI .map file, read into a 2D list, or a file in the binary grid format, memory-mapped.
+        :return: A GridModel over the loaded grid.
+        """
+        from maps import load_map, open_grid
+        grid = load_map(path) if path.endswith(".map") else open_grid(path)
+        return cls(len(grid), len(grid[0]), grid)
+
+    def toggle(self, row, col):
+        """
+        :param row: The row of the cell to toggle.
+        :param col: The column of the cell to toggle.
+        :return: True if the cell is now an obstacle.
+        """
+        self.set_cell(row, col, self.grid[row][col] == 0)
+        return self.grid[row][col] == 1
+
+    def set_cell(self, row, col, blocked):
+        """
+        :param row: The row of the cell.
+        :param col: The column of the cell.
+        :param blocked: True to place an obstacle on the cell, False to clear it.
+        :return: None
+        """
+        self.set_cells([(row, col, blocked)])
+
+    def set_cells(self, changes):
+        """
+        :param changes: An iterable of (row, col, blocked) tuples.
+        :return: None
+        """
+        changes = list(changes)
+        for row, col, blocked in changes:
+            self.grid[row][col] = 1 if blocked else 0
+        self.version += 1
+        for index in self.component_indexes.values():
+            for row, col, blocked in changes:
+                index.set_cell(row, col, blocked)
+        for occupancy in self.occupancy_grids.values():
+            occupancy.set_cells(changes)
+
+    def changed(self):
+        """
+        :return: None
+        """
+        self.version += 1
+        # the edits are unknown, so the component indexes and occupancy grids are rebuilt when next needed
+        self.component_indexes = {}
+        self.occupancy_grids = {}
+
+    def obstacles(self):
+        """
+        :return: A list of the (row, col) positions of every obstacle.
+        """
+        return [(row, col) for row in range(self.height) for col in range(self.width) if self.grid[row][col] == 1]
+
+    def components(self, diagonal=False):
+        """
+        :param diagonal: Indicates if diagonal movement is allowed.
+        :return: The ComponentIndex of the grid for the movement mode, built on first use.
+        """
+        index = self.component_indexes.get(diagonal)
+        if index is None:
+            from components import ComponentIndex
+            index = self.component_indexes[diagonal] = ComponentIndex(self.grid, diagonal)
+        return index
+
+    def connected(self, start_pos, target_pos, diagonal=False):
+        """
+        :param start_pos: The start position.
+        :param target_pos: The target position.
+        :param diagonal: Indicates if diagonal movement is allowed.
+        :return: True if both cells are free and a path exists between them.
+        """
+        return self.components(diagonal).connected(start_pos, target_pos)
+
+    def occupancy(self, diagonal=False):
+        """
+        :param diagonal: Indicates if diagonal movement is allowed.
+        :return: The OccupancyGrid of the grid for the movement mode, built on first use.
+        """
+        occupancy = self.occupancy_grids.get(diagonal)
+        if occupancy is None:
+            from occupancy import OccupancyGrid
+            occupancy = self.occupancy_grids[diagonal] = OccupancyGrid(self.grid, diagonal)
+        return occupancy
+
+    def create_solver(self, start_pos, target_pos, solver="astar", diagonal=False, diagonal_cost=True, **options):
+        """
+        :param start_pos: The start position.
+        :param target_pos: The target position.
+        :param solver: A key of SOLVERS.
+        :param diagonal: Indicates if diagonal movement is allowed.
+        :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+        :param options: Constructor options for the solver.
+        :return: An instance of the solver, ready for find_path, given the component index of the grid so queries
+            between different components or to an obstacle fail without searching.
+        """
+        options.setdefault("components", self.components(diagonal))
+        return create_solver(solver, self.grid, start_pos, target_pos, diagonal, diagonal_cost, **options)
+
+    def solve(self, start_pos, target_pos, solver="astar", diagonal=False, diagonal_cost=True, **options):
+        """
+        :param start_pos: The start position.
+        :param target_pos: The target position.
+        :param solver: A key of SOLVERS.
+        :param diagonal: Indicates if diagonal movement is allowed.
+        :param diagonal_cost: Indicates if diagonal moves cost sqrt(2) instead of 1.
+        :param options: Constructor options for the solver.
+        :return: The solver's find_path result; queries between different components fail without searching.
+        """
+        return self.create_solver(start_pos, target_pos, solver, diagonal, diagonal_cost, **options).find_path()
+
+
+def parse_position(text):
+    """
+    :param text: A position written as "row,col".
+    :return: A (row, col) tuple.
+    """
+    row, col = text.split(",")
+    return int(row), int(col)
+
+
+def main(argv=None):
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(
+        prog="python -m pathfinding", description="Headless grid pathfinding.",
+        epilog="example: python -m pathfinding solve map.map --start 0,0 --target 99,99 --solver jps --diagonal")
+    commands = parser.add_subparsers(dest="command", required=True)
+    solve = commands.add_parser("solve", help="find a path on a map file")
+    solve.add_argument("map", help="a MovingAI .map file or a binary grid file")
+    solve.add_argument("--start", type=parse_position, required=True, help="row,col")
+    solve.add_argument("--target", type=parse_position, required=True, help="row,col")
+    solve.add_argument("--solver", default="astar", choices=sorted(SOLVERS))
+    solve.add_argument("--diagonal", action="store_true", help="allow diagonal moves costing sqrt(2)")
+    solve.add_argument("--unit-diagonal", action="store_true", help="allow diagonal moves costing 1")
+    solve.add_argument("--landmarks", help="a directory of landmark tables to load or build for an ALT heuristic")
+    solve.add_argument("--max-nodes", type=int, help="the number of transposition table slots of the idastar solver")
+    solve.add_argument("--json", action="store_true", help="print the result, including the path, as JSON")
+    commands.add_parser("solvers", help="list the registered solvers")
+    args = parser.parse_args(argv)
+
+    if args.command == "solvers":
+        for name, (module, class_name, options) in sorted(SOLVERS.items()):
+            print(f"{name}: {module}.{class_name}" + (f" {options}" if options else ""))
+        return 0
+
+    start_time = time.perf_counter()
+    model = GridModel.load(args.map)
+    load_time = time.perf_counter() - start_time
+    diagonal = args.diagonal or args.unit_diagonal
+    diagonal_cost = not args.unit_diagonal
+    options = {}
+    if args.landmarks and args.solver == "bidirectional":
+        parser.error("the bidirectional solver builds its own heuristic and cannot use --landmarks")
+    if args.max_nodes is not None:
+        if args.solver != "idastar":
+            parser.error("--max-nodes only applies to the idastar solver")
+        options["max_nodes"] = args.max_nodes
+    if args.landmarks:
+        from landmarks import Landmarks
+        options["heuristic"] = Landmarks.load_or_build(model.grid, args.landmarks, diagonal=diagonal,
+                                                       diagonal_cost=diagonal_cost).heuristic
+    # built like GridModel.solve's solver, keeping the instance for its stats
+    alg = model.create_solver(args.start, args.target, args.solver, diagonal, diagonal_cost, **options)
+    result = alg.find_path()
+    found = result[0] is not None
+    summary = {
+        "found": found,
+        "cost": result[2] if found else None,
+        "steps": len(result[0]) - 1 if found else None,
+        "time": result[1],
+        "load_time": load_time,
+        "expanded": alg.stats.expanded,
+    }
+    if args.json:
+        summary["path"] = result[0]
+        print(json.dumps(summary))
+    elif found:
+        print(f"cost {summary['cost']}, {summary['steps']} steps, {summary['expanded']} expanded, "
+              f"searched in {summary['time']:.4f}s, loaded in {load_time:.4f}s")
+    else:
+        print(f"no path, {summary['expanded']} expanded, searched in {summary['time']:.4f}s")
+    return 0 if found else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,124 @@
+import pygame
+from pygame import gfxdraw
+
+# cell states, in increasing drawing priority
+EMPTY, EXPLORED, OBSTACLE, PATH, START, TARGET = range(6)
+
+
+class GridRenderer:
+    """
+        GridRenderer draws the board onto a display surface, redrawing only the cells whose state changed.
+
+        The background and grid lines are drawn once onto a cached surface. The renderer remembers the state of
+        every marked cell (start, target, path, obstacle or explored), and each update compares the new marks with
+        the old ones, restores the cached background under every cell that changed, draws its new circle and
+        returns the changed rectangles for ``pygame.display.update``. Unmarked cells are never touched, so the cost
+        of a frame depends on how many cells changed rather than on the size of the board.
+
+        Attributes
+        ----------
+        rows : int
+            The number of rows on the board.
+        cols : int
+            The number of columns on the board.
+        block_size : int
+            The width and height of a cell in pixels.
+        origin : tuple
+            The pixel position of the top left corner of the board.
+        colors : dict
+            The fill color for each cell state.
+        states : dict
+            The state of every cell that is not EMPTY.
+
+        Methods
+        -------
+        draw_all(screen)
+            Draws the whole board and returns its rectangle.
+        update(screen, start, target, path, obstacles, explored)
+            Applies the new marks, redraws the cells that changed and returns their rectangles.
+    """
+    def __init__(self, rows, cols, block_size, origin, background_color, line_color, colors):
+        self.rows = rows
+        self.cols = cols
+        self.block_size = block_size
+        self.origin = origin
+        self.colors = colors
+        self.radius = max(1, block_size // 2 - 9)
+        self.states = {}
+
+        width, height = cols * block_size, rows * block_size
+        self.board_rect = pygame.Rect(origin[0], origin[1], width, height)
+        # the empty board, with the same coordinates as the screen so cell rects can be blitted directly
+        self.background = pygame.Surface((origin[0] + width, origin[1] + height))
+        self.background.fill(background_color)
+        for row in range(rows):
+            for col in range(cols):
+                pygame.draw.rect(self.background, line_color, self.cell_rect(row, col), 1)
+        pygame.draw.rect(self.background, line_color, self.board_rect, 2)
+
+    def cell_rect(self, row, col):
+        """
+        :param row: The row of the cell.
+        :param col: The column of the cell.
+        :return: The pixel rectangle of the cell.
+        """
+        return pygame.Rect(col * self.block_size + self.origin[0], row * self.block_size + self.origin[1],
+                           self.block_size, self.block_size)
+
+    def draw_cell(self, screen, row, col, state):
+        """
+        Restores the background under a cell and draws its circle.
+
+        :param screen: The display surface.
+        :param row: The row of the cell.
+        :param col: The column of the cell.
+        :param state: The state of the cell.
+        :return: The pixel rectangle that was redrawn.
+        """
+        rect = self.cell_rect(row, col)
+        # a pixel of margin restores the shared grid lines, which never reach the circles of neighboring cells
+        area = rect.inflate(2, 2)
+        screen.blit(self.background, area, area)
+        if state != EMPTY:
+            gfxdraw.filled_circle(screen, rect.centerx, rect.centery, self.radius, self.colors[state])
+            gfxdraw.aacircle(screen, rect.centerx, rect.centery, self.radius, self.colors[state])
+        return area
+
+    def draw_all(self, screen):
+        """
+        :param screen: The display surface.
+        :return: The pixel rectangle of the board.
+        """
+        area = self.board_rect.inflate(2, 2)
+        screen.blit(self.background, area, area)
+        for (row, col), state in self.states.items():
+            self.draw_cell(screen, row, col, state)
+        return area
+
+    def update(self, screen, start, target, path, obstacles, explored):
+        """
+        :param screen: The display surface.
+        :param start: The start position, or None.
+        :param target: The target position, or None.
+        :param path: The cells on the path to show.
+        :param obstacles: The obstacle cells.
+        :param explored: The explored cells to show.
+        :return: A list of the pixel rectangles that were redrawn.
+        """
+        states = {}
+        for state, cells in ((EXPLORED, explored), (OBSTACLE, obstacles), (PATH, path)):
+            for cell in cells:
+                states[cell] = state
+        if start:
+            states[start] = START
+        if target:
+            states[target] = TARGET
+
+        dirty = []
+        old_states = self.states
+        for cell in old_states.keys() | states.keys():
+            state = states.get(cell, EMPTY)
+            if state != old_states.get(cell, EMPTY):
+                dirty.append(self.draw_cell(screen, cell[0], cell[1], state))
+        self.states = states
+        return dirty